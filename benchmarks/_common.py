@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import numpy as np
+
+# services are imported the way they are laid out inside their containers
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "services"))
+
+def timeit(fn, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def synthetic_frames(num_frames, height=1080, width=1920, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    return np.stack([np.roll(base, i, axis=1) for i in range(num_frames)])
+
+def synthetic_player_tracks(num_frames, num_players=10, height=1080, width=1920, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(100, width - 200, num_players)
+    y = rng.uniform(200, height - 300, num_players)
+    tracks = []
+    for _ in range(num_frames):
+        x += rng.normal(0, 3, num_players)
+        y += rng.normal(0, 3, num_players)
+        tracks.append({
+            track_id + 1: {"bbox": [float(x[track_id]), float(y[track_id]), float(x[track_id] + 60), float(y[track_id] + 160)]}
+            for track_id in range(num_players)
+        })
+    return tracks
+
+def synthetic_ball_tracks(num_frames, height=1080, width=1920, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    x, y = width / 2, height / 2
+    tracks = []
+    for _ in range(num_frames):
+        x = float(np.clip(x + rng.normal(0, 8), 20, width - 40))
+        y = float(np.clip(y + rng.normal(0, 8), 40, height - 40))
+        tracks.append({1: {"bbox": [x, y, x + 20, y + 20]}})
+    return tracks
@@ -0,0 +1,37 @@
+import os
+import numpy as np
+from benchmarks._common import timeit, synthetic_frames, synthetic_player_tracks, synthetic_ball_tracks
+
+from orchestrator_service.canvas import PlayerTrackDrawer, BallTrackDrawer, FrameAnnotator
+
+NUM_FRAMES = 64
+
+def two_drawer_path(frames, player_tracks, team_assignments, ball_acquisition_list, ball_tracks):
+    player_draw = PlayerTrackDrawer()
+    ball_draw = BallTrackDrawer()
+    player_frames = player_draw.draw_annotations(frames, player_tracks, team_assignments, ball_acquisition_list)
+    return ball_draw.draw_annotations(player_frames, ball_tracks)
+
+def main():
+    frames = synthetic_frames(NUM_FRAMES)
+    player_tracks = synthetic_player_tracks(NUM_FRAMES)
+    ball_tracks = synthetic_ball_tracks(NUM_FRAMES)
+    team_assignments = [{pid: 1 + pid % 2 for pid in frame} for frame in player_tracks]
+    ball_acquisition_list = [1 + (i // 10) % 10 for i in range(NUM_FRAMES)]
+    args = (player_tracks, team_assignments, ball_acquisition_list, ball_tracks)
+
+    baseline_time, baseline = timeit(lambda: two_drawer_path(frames, *args))
+    print(f"two drawers            : {NUM_FRAMES / baseline_time:8.1f} fps")
+
+    cpu_count = os.cpu_count() or 1
+    for num_workers in sorted({1, 2, 4, 8, cpu_count}):
+        if num_workers > cpu_count:
+            continue
+        annotator = FrameAnnotator(num_workers=num_workers)
+        fused_time, fused = timeit(lambda: annotator.draw_annotations(frames, *args))
+        identical = all(np.array_equal(a, b) for a, b in zip(baseline, fused))
+        print(f"fused, {num_workers:2d} workers     : {NUM_FRAMES / fused_time:8.1f} fps "
+              f"({baseline_time / fused_time:4.1f}x, identical output: {identical})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import numpy as np
+from benchmarks._common import timeit
+
+from detector_service.tracking.ball_trajectory import gate_detections
+
+# a full game is around two hours of video at 30 fps
+FRAME_COUNTS = [18000, 54000, 216000]
+OUTLIER_SHARE = 0.05
+MISSING_SHARE = 0.2
+
+def synthetic_ball_boxes(num_frames, seed=0):
+    # a smooth ball path with missed frames and a share of far-off false detections
+    rng = np.random.default_rng(seed)
+    xy = np.cumsum(rng.normal(0, 6, size=(num_frames, 2)), axis=0) + [960, 540]
+    outliers = rng.random(num_frames) < OUTLIER_SHARE
+    xy[outliers] += rng.uniform(200, 600, size=(outliers.sum(), 2)) * rng.choice([-1, 1], size=(outliers.sum(), 2))
+    bboxes = np.hstack([xy, xy + 20])
+    valid = rng.random(num_frames) >= MISSING_SHARE
+    bboxes[~valid] = np.nan
+    return bboxes, valid
+
+def legacy_gate(bboxes, valid, max_permitted_pixel_dist=25):
+    # the frame-by-frame loop over per-frame dicts BallTracker.remove_incorrect_detections used
+    ball_positions = [{1: {"bbox": bbox}} if ok else {} for bbox, ok in zip(bboxes.tolist(), valid.tolist())]
+    prev_good_frame_idx = -1
+    for i in range(len(ball_positions)):
+        curr_bbox = ball_positions[i].get(1, {}).get("bbox", [])
+        if len(curr_bbox) == 0:
+            continue
+        if prev_good_frame_idx == -1:
+            prev_good_frame_idx = i
+            continue
+        prev_good_bbox = ball_positions[prev_good_frame_idx].get(1, {}).get("bbox", [])
+        frame_gap = i - prev_good_frame_idx
+        if np.linalg.norm(np.array(prev_good_bbox[:2]) - np.array(curr_bbox[:2])) > max_permitted_pixel_dist * frame_gap:
+            ball_positions[i] = {}
+        else:
+            prev_good_frame_idx = i
+    return np.array([bool(position) for position in ball_positions])
+
+def main():
+    for num_frames in FRAME_COUNTS:
+        bboxes, valid = synthetic_ball_boxes(num_frames)
+        legacy_time, legacy = timeit(lambda: legacy_gate(bboxes, valid), repeat=1)
+        gate_time, gated = timeit(lambda: gate_detections(bboxes, valid))
+        print(f"{num_frames:7d} frames, {int(valid.sum() - gated.sum()):5d} rejected: "
+              f"loop over dicts {legacy_time * 1000:8.1f} ms, gate_detections {gate_time * 1000:7.1f} ms "
+              f"({legacy_time / gate_time:5.1f}x), identical: {np.array_equal(legacy, gated)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+import numpy as np
+from benchmarks._common import timeit
+from benchmarks.bench_minimap import COURT, synthetic_td_tracks
+
+from orchestrator_service.canvas import TDOverlay
+from orchestrator_service.court_control import CourtControlEngine
+
+NUM_FRAMES = 512
+CHUNK_SIZE = 64
+
+def main():
+    overlay = TDOverlay(COURT, COURT, xz=1280, yz=720)
+    td_tracks = synthetic_td_tracks(NUM_FRAMES)
+
+    def polygon_path():
+        # stats used to come out of the minimap renderer, voronoi facets clipped to the court
+        control = []
+        for start_frame in range(0, NUM_FRAMES, CHUNK_SIZE):
+            _, chunk_control = overlay.draw_minimaps(td_tracks, start_frame=start_frame, num_frames=CHUNK_SIZE,
+                                                     num_workers=os.cpu_count() or 1)
+            control.extend(chunk_control)
+        return control
+
+    polygon_time, polygon_control = timeit(polygon_path)
+    print(f"draw_minimaps (render + polygon stats): {NUM_FRAMES / polygon_time:10.1f} frames/s")
+
+    for grid_w, grid_h in [(32, 18), (64, 36), (128, 72)]:
+        engine = CourtControlEngine(minimap_w=1280, minimap_h=720, grid_w=grid_w, grid_h=grid_h)
+        engine_time, control = timeit(lambda: engine.get_control_stats(td_tracks))
+        diff = np.array([[c[1] - p[1], c[2] - p[2]] for c, p in zip(control, polygon_control)])
+        print(f"CourtControlEngine {grid_w:3d}x{grid_h:<3d}         : {NUM_FRAMES / engine_time:10.1f} frames/s "
+              f"({polygon_time / engine_time:6.1f}x, median abs diff {np.median(np.abs(diff)):.4f}, "
+              f"mean team 1 share {np.mean([c[1] for c in control]):.4f} vs {np.mean([p[1] for p in polygon_control]):.4f})")
+
+if __name__ == "__main__":
+    main()
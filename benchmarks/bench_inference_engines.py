@@ -0,0 +1,54 @@
+import os
+import sys
+from benchmarks._common import ROOT, timeit
+
+from shared.utils import read_video, box_iou, match_boxes
+from detector_service.tracking import PlayerTracker, BallTracker, load_model
+from detector_service.tracking import get_player_production_model_path, get_ball_production_model_path
+
+VIDEO = os.path.join(ROOT, "tests", "s.mp4")
+NUM_FRAMES = 120
+CONFIGS = [("onnx", False), ("openvino", False), ("openvino", True)]
+
+def agreement(baseline, detections, min_iou=0.5):
+    # share of boxes (same class, IoU >= min_iou) found by both, over all boxes either side found
+    matched, total = 0, 0
+    for base, det in zip(baseline, detections):
+        base_boxes, base_cls = base.boxes.xyxy.cpu().numpy(), base.boxes.cls.cpu().numpy()
+        boxes, cls = det.boxes.xyxy.cpu().numpy(), det.boxes.cls.cpu().numpy()
+        total += max(len(base_boxes), len(boxes))
+        if len(base_boxes) == 0 or len(boxes) == 0:
+            continue
+        overlap = box_iou(base_boxes, boxes) * (base_cls[:, None] == cls[None, :])
+        matched += len(match_boxes(overlap, min_iou))
+    return matched / total if total else 1.0
+
+def bench(name, tracker_cls, weights_path, frames):
+    baseline_tracker = tracker_cls(model=load_model(weights_path, engine="torch"), device="cpu")
+    baseline_tracker.detect_batch(frames[:1])
+    baseline_time, baseline = timeit(lambda: baseline_tracker.detect_frames(frames), repeat=1)
+    print(f"{name:6s} torch          : {len(frames) / baseline_time:7.1f} fps")
+
+    for engine, int8 in CONFIGS:
+        label = f"{engine}{' int8' if int8 else ''}"
+        try:
+            model = load_model(weights_path, engine=engine, int8=int8, calibration_video=VIDEO)
+        except Exception as e:
+            print(f"{name:6s} {label:15s}: skipped ({e!r})")
+            continue
+        tracker = tracker_cls(model=model, device="cpu")
+        tracker.detect_batch(frames[:1])
+        engine_time, detections = timeit(lambda: tracker.detect_frames(frames), repeat=1)
+        print(f"{name:6s} {label:15s}: {len(frames) / engine_time:7.1f} fps "
+              f"({baseline_time / engine_time:4.1f}x, detection agreement {agreement(baseline, detections):.3f})")
+
+def main():
+    frames = read_video(VIDEO)[:NUM_FRAMES]
+    if not frames:
+        sys.exit(f"Could not read {VIDEO} (git lfs pull?)")
+
+    bench("player", PlayerTracker, get_player_production_model_path(), frames)
+    bench("ball", BallTracker, get_ball_production_model_path(), frames)
+
+if __name__ == "__main__":
+    main()
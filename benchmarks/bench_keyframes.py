@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+import numpy as np
+from benchmarks._common import ROOT
+
+from shared.utils import read_video, box_iou, match_boxes
+from detector_service.tracking import PlayerTracker, load_model, get_player_production_model_path
+
+VIDEO = os.path.join(ROOT, "tests", "s.mp4")
+STRIDES = [1, 2, 3, 4, 5]
+
+def track_accuracy(baseline, tracks, min_iou=0.5):
+    # box recall/precision against per-frame detection, ids are ignored since they are assigned independently
+    matched_ious, num_baseline, num_tracks = [], 0, 0
+    for base, frame in zip(baseline, tracks):
+        base_boxes = [info["bbox"] for info in base.values()]
+        boxes = [info["bbox"] for info in frame.values()]
+        num_baseline += len(base_boxes)
+        num_tracks += len(boxes)
+        if base_boxes and boxes:
+            overlap = box_iou(base_boxes, boxes)
+            matched_ious += [float(overlap[i, j]) for i, j in match_boxes(overlap, min_iou)]
+    recall = len(matched_ious) / num_baseline if num_baseline else 1.0
+    precision = len(matched_ious) / num_tracks if num_tracks else 1.0
+    return recall, precision, float(np.mean(matched_ious)) if matched_ious else 0.0
+
+def main():
+    frames = read_video(VIDEO)
+    if not frames:
+        sys.exit(f"Could not read {VIDEO} (git lfs pull?)")
+    model = load_model(get_player_production_model_path())
+
+    baseline, baseline_time = None, None
+    for stride in STRIDES:
+        tracker = PlayerTracker(model=model, keyframe_stride=stride)
+        tracker.detect_batch(frames[:1])
+        start = time.perf_counter()
+        tracks = tracker.get_object_tracks(frames)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline, baseline_time = tracks, elapsed
+
+        recall, precision, mean_iou = track_accuracy(baseline, tracks)
+        keyframes = tracker.scheduler.num_keyframes
+        print(f"stride {stride}: {len(frames) / elapsed:7.1f} fps ({baseline_time / elapsed:4.1f}x), "
+              f"detector on {keyframes}/{len(frames)} frames, recall {recall:.3f}, "
+              f"precision {precision:.3f}, mean IoU {mean_iou:.3f}")
+
+if __name__ == "__main__":
+    main()
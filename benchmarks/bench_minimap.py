@@ -0,0 +1,46 @@
+import os
+import numpy as np
+from benchmarks._common import ROOT, timeit
+
+from orchestrator_service.canvas import TDOverlay
+
+NUM_FRAMES = 64
+COURT = os.path.join(ROOT, "services", "orchestrator_service", "imgs", "court.jpg")
+
+def synthetic_td_tracks(num_frames, num_players=10, seed=0):
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(0, 1, size=(num_players, 2))
+    td_tracks = []
+    for _ in range(num_frames):
+        pos = np.clip(pos + rng.normal(0, 0.005, size=pos.shape), 0, 1)
+        td_tracks.append({
+            track_id + 1: {"pos": (float(pos[track_id, 0]), float(pos[track_id, 1])), "team_id": 1 + track_id % 2}
+            for track_id in range(num_players)
+        })
+    return td_tracks
+
+def main():
+    overlay = TDOverlay(COURT, COURT, xz=1280, yz=720)
+    td_tracks = synthetic_td_tracks(NUM_FRAMES)
+
+    def per_frame_path():
+        # frames allocated per video frame and composited, like /process did before draw_minimaps
+        frames = [np.zeros((720, 1280, 3), dtype=np.uint8) for _ in range(NUM_FRAMES)]
+        return overlay.draw_overlay(frames, td_tracks)
+
+    baseline_time, (baseline, baseline_control) = timeit(per_frame_path)
+    print(f"draw_overlay           : {NUM_FRAMES / baseline_time:8.1f} fps")
+
+    cpu_count = os.cpu_count() or 1
+    for num_workers in sorted({1, 2, 4, 8, cpu_count}):
+        if num_workers > cpu_count:
+            continue
+        batch_time, (batch, control) = timeit(
+            lambda: overlay.draw_minimaps(td_tracks, num_frames=NUM_FRAMES, num_workers=num_workers)
+        )
+        identical = all(np.array_equal(a, b) for a, b in zip(baseline, batch)) and control == baseline_control
+        print(f"draw_minimaps, {num_workers:2d} workers: {NUM_FRAMES / batch_time:8.1f} fps "
+              f"({baseline_time / batch_time:4.1f}x, identical output: {identical})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from benchmarks._common import ROOT
+
+# the segment workers map the frames from the store by digest, so it has to exist before shared is imported
+os.environ.setdefault("FRAME_STORE_DIR", os.path.join(tempfile.gettempdir(), "bench_frame_store"))
+
+from shared.frame_store import load_video_frames
+from shared.utils import box_iou, match_boxes
+from detector_service.tracking import (
+    PlayerTracker,
+    BallTracker,
+    SegmentTracker,
+    load_model,
+    track_frames,
+    iter_frame_batches,
+    get_player_production_model_path,
+    get_ball_production_model_path,
+)
+
+VIDEO = os.path.join(ROOT, "tests", "s.mp4")
+SEGMENTS = [1, 2, 4]
+OVERLAP = 30
+
+def id_switches(baseline, frame_arrays, min_iou=0.5):
+    # single-tracker ids are the reference, a switch is a reference id matched to a different id than before
+    switches, matched, last_id = 0, 0, {}
+    for (base_ids, base_boxes), (ids, boxes) in zip(baseline, frame_arrays):
+        if len(base_ids) == 0 or len(ids) == 0:
+            continue
+        for i, j in match_boxes(box_iou(base_boxes, boxes), min_iou):
+            base_id, track_id = int(base_ids[i]), int(ids[j])
+            if base_id in last_id and last_id[base_id] != track_id:
+                switches += 1
+            last_id[base_id] = track_id
+            matched += 1
+    return switches, matched
+
+def main():
+    if os.path.getsize(VIDEO) < 1024:
+        sys.exit(f"{VIDEO} is a git lfs pointer, run git lfs pull first")
+    digest, frames = load_video_frames(VIDEO)
+    player_model_path, ball_model_path = get_player_production_model_path(), get_ball_production_model_path()
+
+    player_model, ball_model = load_model(player_model_path), load_model(ball_model_path)
+    PlayerTracker(model=player_model).detect_batch(np.ascontiguousarray(frames[:1]))
+    start = time.perf_counter()
+    baseline, _ = track_frames(PlayerTracker(model=player_model), BallTracker(model=ball_model), iter_frame_batches(frames))
+    baseline_time = time.perf_counter() - start
+    num_ids = len(np.unique(np.concatenate([ids for ids, _ in baseline])))
+    print(f"{len(frames)} frames, {os.cpu_count()} CPUs")
+    print(f"single tracker : {len(frames) / baseline_time:6.1f} fps, {num_ids} ids")
+
+    for num_segments in SEGMENTS:
+        tracker = SegmentTracker(player_model_path, ball_model_path, num_workers=num_segments, overlap=OVERLAP)
+        # loads the models in every worker before timing
+        tracker.track(digest, min(len(frames), num_segments * 2 * OVERLAP))
+        start = time.perf_counter()
+        frame_arrays, _ = tracker.track(digest, len(frames))
+        elapsed = time.perf_counter() - start
+        tracker.shutdown()
+
+        switches, matched = id_switches(baseline, frame_arrays)
+        num_ids = len(np.unique(np.concatenate([ids for ids, _ in frame_arrays])))
+        print(f"{num_segments} segments     : {len(frames) / elapsed:6.1f} fps ({baseline_time / elapsed:4.1f}x), "
+              f"{num_ids} ids, {switches} id switches over {matched} matched boxes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import numpy as np
+from benchmarks._common import timeit, synthetic_player_tracks
+
+from team_assigner_service.processing import color_histograms, ParallelFeatureExtractor
+
+NUM_FRAMES = 120
+NUM_PLAYERS = 12
+HEIGHT, WIDTH = 1080, 1920
+CROP_FACTOR = 0.4
+WORKERS = [2, 4, 8]
+
+def write_frame_file(path, seed=0):
+    # laid out like the frame store: (N, H, W, 3) uint8 in one memory-mapped file
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, size=(HEIGHT, WIDTH, 3), dtype=np.uint8)
+    frames = np.memmap(path, dtype=np.uint8, mode="w+", shape=(NUM_FRAMES, HEIGHT, WIDTH, 3))
+    for i in range(NUM_FRAMES):
+        frames[i] = np.roll(base, i, axis=1)
+    frames.flush()
+    del frames
+    return np.asarray(np.memmap(path, dtype=np.uint8, mode="r", shape=(NUM_FRAMES, HEIGHT, WIDTH, 3)))
+
+def main():
+    tracks = synthetic_player_tracks(NUM_FRAMES, num_players=NUM_PLAYERS, height=HEIGHT, width=WIDTH)
+    frame_ids = np.repeat(np.arange(NUM_FRAMES), NUM_PLAYERS)
+    boxes = np.concatenate([[info["bbox"] for info in frame.values()] for frame in tracks])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        frames = write_frame_file(os.path.join(tmpdir, "frames.bin"))
+        # what read_frames_at hands over when the video is not in the frame store
+        frame_dict = {i: np.array(frames[i]) for i in range(NUM_FRAMES)}
+
+        base_time, baseline = timeit(lambda: color_histograms(frames, frame_ids, boxes, CROP_FACTOR))
+        print(f"{len(boxes)} crops, {os.cpu_count()} CPUs")
+        print(f"1 worker, in-process   : {base_time * 1000:7.1f} ms")
+
+        for num_workers in WORKERS:
+            extractor = ParallelFeatureExtractor(num_workers, min_boxes_per_worker=1)
+            extractor.extract(frames, frame_ids, boxes, CROP_FACTOR) # starts the worker processes
+            for name, source in [("frame store", frames), ("crop strip", frame_dict)]:
+                worker_time, features = timeit(lambda: extractor.extract(source, frame_ids, boxes, CROP_FACTOR))
+                print(f"{num_workers} workers, {name:12s} : {worker_time * 1000:7.1f} ms "
+                      f"({base_time / worker_time:4.1f}x, identical: {np.array_equal(features, baseline)})")
+            extractor.shutdown()
+
+if __name__ == "__main__":
+    main()
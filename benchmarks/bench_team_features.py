@@ -0,0 +1,57 @@
+import cv2
+import numpy as np
+from PIL import Image
+from benchmarks._common import timeit, synthetic_frames, synthetic_player_tracks
+
+from team_assigner_service.processing import color_histograms
+
+NUM_FRAMES = 120
+NUM_PLAYERS = 12
+CROP_FACTORS = [0.2, 0.4]
+
+def legacy_center_crop(img_array, crop_factor=0.4, skew_factor=0.1):
+    h, w, _ = img_array.shape
+    h_center, w_center = h // 2, w // 2
+    h_crop, w_crop = int(h * crop_factor), int(w * crop_factor)
+    h_skew = int(h * skew_factor)
+
+    y1 = max(0, h_center - h_crop // 2 - h_skew)
+    y2 = min(h, h_center + h_crop // 2 - h_skew)
+    x1 = max(0, w_center - w_crop // 2)
+    x2 = min(w, w_center + w_crop // 2)
+    return img_array[y1:y2, x1:x2]
+
+def legacy_features(frame, boxes, crop_factor):
+    # per-crop PIL round trip, cvtColor and calcHist, as TeamAssigner did before
+    features = []
+    for x1, y1, x2, y2 in boxes:
+        pil = Image.fromarray(frame[int(y1):int(y2), int(x1):int(x2)])
+        img_crop = legacy_center_crop(np.array(pil), crop_factor=crop_factor)
+        hsv = cv2.cvtColor(img_crop, cv2.COLOR_RGB2HSV)
+        hist = cv2.calcHist([hsv], [0, 1, 2], None, (8, 4, 4), [0, 180, 0, 256, 0, 256])
+        cv2.normalize(hist, hist)
+        features.append(hist.flatten())
+    return np.array(features)
+
+def main():
+    frames = synthetic_frames(NUM_FRAMES)
+    tracks = synthetic_player_tracks(NUM_FRAMES, num_players=NUM_PLAYERS)
+    boxes = [np.array([info["bbox"] for info in frame.values()]) for frame in tracks]
+    frame_ids = np.repeat(np.arange(NUM_FRAMES), NUM_PLAYERS)
+    all_boxes = np.concatenate(boxes)
+
+    num_crops = len(all_boxes)
+    for crop_factor in CROP_FACTORS:
+        legacy_time, legacy = timeit(lambda: np.concatenate([legacy_features(f, b, crop_factor) for f, b in zip(frames, boxes)]))
+        frame_time, per_frame = timeit(lambda: np.concatenate([
+            color_histograms(frames, [i] * len(b), b, crop_factor) for i, b in enumerate(boxes)
+        ]))
+        batched_time, batched = timeit(lambda: color_histograms(frames, frame_ids, all_boxes, crop_factor))
+        max_diff = max(float(np.abs(legacy - per_frame).max()), float(np.abs(legacy - batched).max()))
+        print(f"crop {crop_factor}, PIL + calcHist per crop : {legacy_time * 1000:7.1f} ms / {num_crops} crops")
+        print(f"crop {crop_factor}, one batch per frame     : {frame_time * 1000:7.1f} ms ({legacy_time / frame_time:5.1f}x)")
+        print(f"crop {crop_factor}, one batch for all crops : {batched_time * 1000:7.1f} ms ({legacy_time / batched_time:5.1f}x), "
+              f"max feature difference {max_diff:.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import numpy as np
+import supervision as sv
+from benchmarks._common import timeit
+
+from shared.utils import frame_arrays_to_columns, frame_arrays_to_tracks
+from detector_service.tracking import PlayerTracker, BallTracker
+
+NUM_FRAMES = 1800 # one minute at 30 fps
+CLASS_NAMES = {0: "Player", 1: "Referee", 2: "basketball", 3: "Hoop"}
+
+def synthetic_detections(num_frames, num_players=10, seed=0):
+    # what ByteTrack hands back per frame: players with track ids, a few referees and ball candidates
+    rng = np.random.default_rng(seed)
+    detections = []
+    for _ in range(num_frames):
+        num_boxes = num_players + 5
+        xy = rng.uniform(0, 1800, size=(num_boxes, 2))
+        detections.append(sv.Detections(
+            xyxy=np.hstack([xy, xy + rng.uniform(20, 160, size=(num_boxes, 2))]).astype(np.float32),
+            confidence=rng.uniform(0.3, 1.0, size=num_boxes).astype(np.float32),
+            class_id=np.array([0] * num_players + [1, 1, 2, 2, 3]),
+            tracker_id=np.arange(1, num_boxes + 1),
+        ))
+    return detections
+
+def legacy_player_tracks(detections):
+    # per-element loop the trackers used before
+    tracks = []
+    for detection_with_tracks in detections:
+        class_names_inv = {val:key for key,val in CLASS_NAMES.items()}
+        frame_tracks = {}
+        for frame_detection in detection_with_tracks:
+            bbox = frame_detection[0].tolist()
+            class_id = frame_detection[3]
+            track_id = frame_detection[4]
+            if class_id == class_names_inv["Player"]:
+                frame_tracks[track_id] = {"bbox": bbox}
+        tracks.append(frame_tracks)
+    return tracks
+
+def legacy_ball_tracks(detections):
+    tracks = []
+    for detection_sv in detections:
+        class_names_inv = {val:key for key,val in CLASS_NAMES.items()}
+        picked_bbox = None
+        max_conf = 0
+        for frame_detection in detection_sv:
+            bbox = frame_detection[0].tolist()
+            class_id = frame_detection[3]
+            conf = frame_detection[2]
+            if class_id == class_names_inv["basketball"]:
+                if max_conf < conf:
+                    picked_bbox = bbox
+                    max_conf = conf
+        tracks.append({} if picked_bbox is None else {1: {"bbox": picked_bbox}})
+    return tracks
+
+def main():
+    detections = synthetic_detections(NUM_FRAMES)
+
+    player_tracker = PlayerTracker(model=object())
+    player_tracker.set_class_names(CLASS_NAMES)
+    ball_tracker = BallTracker(model=object())
+    ball_tracker.set_class_names(CLASS_NAMES)
+
+    legacy_time, legacy_players = timeit(lambda: legacy_player_tracks(detections))
+    array_time, frame_arrays = timeit(lambda: [player_tracker.extract_tracks(d) for d in detections])
+    columns_time, _ = timeit(lambda: frame_arrays_to_columns(frame_arrays))
+    dicts_time, players = timeit(lambda: frame_arrays_to_tracks(frame_arrays))
+    identical = [{int(k): v for k, v in frame.items()} for frame in legacy_players] == players
+    print(f"players, per-element loop     : {legacy_time * 1000:7.1f} ms / {NUM_FRAMES} frames")
+    print(f"players, masked arrays        : {array_time * 1000:7.1f} ms ({legacy_time / array_time:5.1f}x), "
+          f"+{columns_time * 1000:.1f} ms to npz columns, +{dicts_time * 1000:.1f} ms to dicts "
+          f"(identical boxes: {identical})")
+
+    legacy_time, legacy_balls = timeit(lambda: legacy_ball_tracks(detections))
+    array_time, picks = timeit(lambda: [ball_tracker.pick_from_detections(d) for d in detections])
+    balls = [{} if bbox is None else {1: {"bbox": bbox}} for bbox, _ in picks]
+    print(f"ball, per-element max scan    : {legacy_time * 1000:7.1f} ms / {NUM_FRAMES} frames")
+    print(f"ball, masked argmax           : {array_time * 1000:7.1f} ms ({legacy_time / array_time:5.1f}x, "
+          f"identical boxes: {legacy_balls == balls})")
+
+if __name__ == "__main__":
+    main()
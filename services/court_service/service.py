@@ -1,10 +1,11 @@
 import os
 import uuid
+import asyncio
 import cv2
 import torch
 import numpy as np
 import json
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 import uvicorn
 from prometheus_fastapi_instrumentator import Instrumentator
 
@@ -14,6 +15,7 @@ from .processing.warp_panorama import warp_image
 
 from .utils.video_io import load_frames
 from shared.storage import s3_upload, download_to_temp
+from shared.frame_store import load_video_frames, load_video_frames_by_reference
 
 app = FastAPI(title="Homography Service")
 Instrumentator().instrument(app).expose(app)
@@ -118,18 +120,35 @@ async def estimate_homography_ep(frame: UploadFile = File(...), reference: Uploa
     }
 
 @app.post("/homographyvideo")
-async def stitch_panorama_ep(video: UploadFile = File(...), reference: UploadFile = Form(...)):
+async def stitch_panorama_ep(
+    video: UploadFile = File(None),
+    reference: UploadFile = Form(...),
+    video_uri: str = Form(None),
+    video_hash: str = Form(None),
+):
     job_id = str(uuid.uuid4())
-    tmp_video = f"/tmp/{job_id}.mp4"
 
     ref_contents = await reference.read()
     ref_nparr = np.frombuffer(ref_contents, np.uint8)
     ref_bgr = cv2.imdecode(ref_nparr, cv2.IMREAD_COLOR)
 
-    with open(tmp_video, "wb") as f:
-        f.write(await video.read())
+    if video is not None:
+        tmp_video = f"/tmp/{job_id}.mp4"
+        with open(tmp_video, "wb") as f:
+            f.write(await video.read())
 
-    frames = load_frames(tmp_video, sample_rate=1)
+        # decoding into the frame store blocks, keep it off the event loop
+        _, frames = await asyncio.to_thread(load_video_frames, tmp_video)
+        os.remove(tmp_video)
+    else:
+        if not video_uri and not video_hash:
+            raise HTTPException(status_code=400, detail="Provide a video, a video_uri or a video_hash")
+        try:
+            _, frames = await asyncio.to_thread(load_video_frames_by_reference, video_hash=video_hash, video_uri=video_uri)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     H = []
     for frame in frames:
@@ -140,8 +159,6 @@ async def stitch_panorama_ep(video: UploadFile = File(...), reference: UploadFil
         else:
             H.append(None)
 
-    os.remove(tmp_video)
-
     return {
         "job_id": job_id,
         "H": H,
@@ -1,13 +1,36 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.encoders import jsonable_encoder
 import uvicorn
+import os
+import json
+import asyncio
 import tempfile
+from contextlib import asynccontextmanager
+import numpy as np
 from pathlib import Path
 
 from prometheus_fastapi_instrumentator import Instrumentator
-from detector_service.tracking import PlayerTracker, BallTracker, get_player_production_model_path, get_ball_production_model_path
-from shared.utils import read_video
+from detector_service.tracking import (
+    PlayerTracker,
+    BallTracker,
+    ModelPool,
+    SegmentTracker,
+    ball_tracks_to_array,
+    array_to_ball_tracks,
+    clean_ball_trajectory,
+    track_frames,
+    iter_frame_batches,
+    get_player_production_model_path,
+    get_ball_production_model_path,
+)
+from shared.frame_store import load_video_frames, load_video_frames_by_reference
+from shared.utils import (
+    TRACKS_MEDIA_TYPE,
+    frame_arrays_to_columns,
+    frame_arrays_to_tracks,
+    encode_track_columns,
+)
 
 def serialize_tracks(tracks):
     out = []
@@ -28,41 +51,174 @@ def serialize_tracks(tracks):
         out.append(frame_objs)
     return out
 
-app = FastAPI()
+def ball_columns(ball_bboxes):
+    # one ball (track id 1) per frame, frames are left out when no ball was ever found
+    frame_idx = np.flatnonzero(~np.isnan(ball_bboxes).any(axis=1)).astype(np.int32)
+    return frame_idx, np.ones(len(frame_idx), dtype=np.int32), ball_bboxes[frame_idx], len(ball_bboxes)
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # the segment workers are spawned processes with their own models, they do not exit with the app on their own
+    if segment_tracker is not None:
+        segment_tracker.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 Instrumentator().instrument(app).expose(app)
 
 player_model_path = get_player_production_model_path()
 ball_model_path = get_ball_production_model_path()
 
-@app.post("/track")
-async def track_video(file: UploadFile = File(...)):
-    player_tracker = PlayerTracker(model_path=player_model_path)
-    ball_tracker = BallTracker(model_path=ball_model_path)
+DETECT_BATCH_SIZE = int(os.getenv("DETECT_BATCH_SIZE", "20"))
+DETECT_QUEUE_DEPTH = int(os.getenv("DETECT_QUEUE_DEPTH", "4"))
+PLAYER_KEYFRAME_STRIDE = int(os.getenv("PLAYER_KEYFRAME_STRIDE", "1"))
+BALL_ROI_SIZE = int(os.getenv("BALL_ROI_SIZE", "0"))
+BALL_ROI_FALLBACK = os.getenv("BALL_ROI_FALLBACK", "full")
+BALL_SMOOTHING = os.getenv("BALL_SMOOTHING") or None # "kalman" to smooth the cleaned trajectory
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_path = Path(tmpdir) / file.filename
-        with tmp_path.open("wb") as f:
-            f.write(await file.read())
+SEGMENT_WORKERS = int(os.getenv("SEGMENT_WORKERS", "0"))
+SEGMENT_OVERLAP = int(os.getenv("SEGMENT_OVERLAP", "30"))
 
-        frames = read_video(str(tmp_path))
+# models are loaded and warmed up once, requests borrow a slot and only build fresh tracker state
+model_pool = ModelPool(player_model_path, ball_model_path, size=int(os.getenv("MODEL_POOL_SIZE", "0")) or None)
 
-        player_tracks = player_tracker.get_object_tracks(
-            frames,
-        )
-        ball_tracks = ball_tracker.get_object_tracks(
-            frames,
+# long videos can be split into overlapping segments tracked on a process pool, ids are stitched afterwards
+segment_tracker = None
+if SEGMENT_WORKERS > 1:
+    segment_tracker = SegmentTracker(
+        player_model_path,
+        ball_model_path,
+        num_workers=SEGMENT_WORKERS,
+        overlap=SEGMENT_OVERLAP,
+        batch_size=DETECT_BATCH_SIZE,
+        queue_depth=DETECT_QUEUE_DEPTH,
+        player_kwargs={"keyframe_stride": PLAYER_KEYFRAME_STRIDE},
+        ball_kwargs={"roi_size": BALL_ROI_SIZE, "fallback": BALL_ROI_FALLBACK},
+    )
+
+def run_tracking(frames, digest=None, on_batch=None):
+    if segment_tracker is not None and digest is not None and len(frames) >= 4 * SEGMENT_OVERLAP:
+        player_frame_arrays, ball_tracks = segment_tracker.track(digest, len(frames), on_batch=on_batch)
+    else:
+        player_frame_arrays, ball_tracks = run_tracking_in_process(frames, on_batch)
+
+    # outlier gating and gap filling on an (N, 4) array, every frame has a ball box afterwards
+    ball_bboxes, ball_valid = ball_tracks_to_array(ball_tracks)
+    ball_bboxes = clean_ball_trajectory(ball_bboxes, ball_valid, smoothing=BALL_SMOOTHING)
+    return player_frame_arrays, ball_bboxes
+
+def run_tracking_in_process(frames, on_batch=None):
+    with model_pool.acquire() as slot:
+        player_tracker = PlayerTracker(model=slot.player_model, device=slot.device,
+                                       keyframe_stride=PLAYER_KEYFRAME_STRIDE)
+        ball_tracker = BallTracker(model=slot.ball_model, device=slot.device,
+                                   roi_size=BALL_ROI_SIZE, fallback=BALL_ROI_FALLBACK)
+
+        # one pass over the frames feeds both models, batches are prefetched into a bounded queue
+        player_frame_arrays, ball_tracks = track_frames(
+            player_tracker,
+            ball_tracker,
+            iter_frame_batches(frames, DETECT_BATCH_SIZE),
+            queue_depth=DETECT_QUEUE_DEPTH,
+            on_batch=on_batch,
         )
+    return player_frame_arrays, ball_tracks
+
+async def load_request_frames(file, video_uri, video_hash):
+    if file is not None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmp_path = Path(tmpdir) / file.filename
+            with tmp_path.open("wb") as f:
+                f.write(await file.read())
+
+            # decoding into the frame store blocks, keep it off the event loop
+            digest, frames = await asyncio.to_thread(load_video_frames, str(tmp_path))
+        return digest, frames
+
+    if not video_uri and not video_hash:
+        raise HTTPException(status_code=400, detail="Provide a file, a video_uri or a video_hash")
+    try:
+        digest, frames = await asyncio.to_thread(load_video_frames_by_reference, video_hash=video_hash, video_uri=video_uri)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return digest, frames
 
-        ball_tracks = ball_tracker.remove_incorrect_detections(ball_tracks)
-        ball_tracks = ball_tracker.interp_ball_pos(ball_tracks)
+def serialize_ball_tracks(ball_bboxes):
+    return serialize_tracks(array_to_ball_tracks(ball_bboxes, ~np.isnan(ball_bboxes).any(axis=1)))
+
+@app.post("/track")
+async def track_video(
+    request: Request,
+    file: UploadFile = File(None),
+    video_uri: str = Form(None),
+    video_hash: str = Form(None),
+):
+    digest, frames = await load_request_frames(file, video_uri, video_hash)
+
+    # queued on the model pool in a worker thread, the event loop keeps accepting requests
+    player_frame_arrays, ball_bboxes = await asyncio.to_thread(run_tracking, frames, digest)
+
+    # columnar binary tracks for clients that ask for them, JSON otherwise
+    if TRACKS_MEDIA_TYPE in request.headers.get("accept", ""):
+        content = encode_track_columns(
+            player_tracks=frame_arrays_to_columns(player_frame_arrays),
+            ball_tracks=ball_columns(ball_bboxes),
+        )
+        return Response(content=content, media_type=TRACKS_MEDIA_TYPE)
 
     payload = {
-        "player_tracks": serialize_tracks(player_tracks),
-        "ball_tracks": serialize_tracks(ball_tracks),
+        "player_tracks": serialize_tracks(frame_arrays_to_tracks(player_frame_arrays)),
+        "ball_tracks": serialize_ball_tracks(ball_bboxes),
     }
     safe_payload = jsonable_encoder(payload)
     return JSONResponse(content=safe_payload)
 
+@app.post("/track/stream")
+async def track_video_stream(
+    file: UploadFile = File(None),
+    video_uri: str = Form(None),
+    video_hash: str = Form(None),
+):
+    """
+    Same tracking as /track, streamed as NDJSON records while detection runs:
+    start (num_frames), player_tracks per batch (start_frame, frames), ball_tracks once cleaned, end.
+    A failure after the stream started is sent as an error record.
+    """
+    digest, frames = await load_request_frames(file, video_uri, video_hash)
+    loop = asyncio.get_running_loop()
+    records = asyncio.Queue()
+
+    def emit(record):
+        loop.call_soon_threadsafe(records.put_nowait, json.dumps(record) + "\n")
+
+    def on_batch(start_frame, frame_arrays):
+        emit({"type": "player_tracks", "start_frame": start_frame,
+              "frames": serialize_tracks(frame_arrays_to_tracks(frame_arrays))})
+
+    async def produce():
+        emit({"type": "start", "num_frames": len(frames)})
+        try:
+            _, ball_bboxes = await asyncio.to_thread(run_tracking, frames, digest, on_batch)
+            emit({"type": "ball_tracks", "frames": serialize_ball_tracks(ball_bboxes)})
+            emit({"type": "end"})
+        except Exception as e:
+            print(f"[Track] Streaming request failed: {e!r}")
+            emit({"type": "error", "detail": repr(e)})
+        loop.call_soon_threadsafe(records.put_nowait, None)
+
+    async def stream():
+        task = asyncio.create_task(produce())
+        while True:
+            line = await records.get()
+            if line is None:
+                break
+            yield line
+        await task
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.get("/ping")
 def ping():
     return {"status": "ok"}
@@ -1,3 +1,8 @@
 from .track_players import PlayerTracker
 from .track_ball import BallTracker
+from .ball_trajectory import ball_tracks_to_array, array_to_ball_tracks, clean_ball_trajectory
+from .engines import ENGINES, load_model, export_model
+from .model_pool import ModelPool
+from .pipeline import track_frames, iter_frame_batches
+from .segments import SegmentTracker, split_segments, match_track_ids
 from .utils import get_player_production_model_path, get_ball_production_model_path
\ No newline at end of file
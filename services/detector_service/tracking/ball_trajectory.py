@@ -0,0 +1,102 @@
+import math
+import numpy as np
+
+def ball_tracks_to_array(ball_tracks):
+    # per-frame {1: {"bbox": [...]}} dicts -> (N, 4) float64 boxes (nan where missing) and a validity mask
+    bboxes = np.full((len(ball_tracks), 4), np.nan)
+    for frame_id, frame in enumerate(ball_tracks):
+        bbox = frame.get(1, {}).get("bbox", [])
+        if len(bbox) == 4:
+            bboxes[frame_id] = bbox
+    valid = ~np.isnan(bboxes).any(axis=1)
+    return bboxes, valid
+
+def array_to_ball_tracks(bboxes, valid=None):
+    if valid is None:
+        return [{1: {"bbox": bbox}} for bbox in bboxes.tolist()]
+    return [{1: {"bbox": bbox}} if ok else {} for bbox, ok in zip(bboxes.tolist(), valid.tolist())]
+
+def gate_detections(bboxes, valid, max_pixel_dist=25):
+    """
+    Drops detections that moved more than max_pixel_dist per frame from the previous kept detection,
+    measured on the top-left corner. One pass over the detected frames that carries the last kept one,
+    each decision depends on the previous, so it stays a loop (over python floats, which is linear
+    in the number of frames and far cheaper than numpy calls per frame).
+    """
+    idx = np.flatnonzero(valid)
+    gated = np.zeros_like(valid)
+    if len(idx) == 0:
+        return gated
+
+    xs, ys = bboxes[idx, 0].tolist(), bboxes[idx, 1].tolist()
+    frame_ids = idx.tolist()
+    keep = [0]
+    last = 0
+    for i in range(1, len(frame_ids)):
+        dx, dy = xs[i] - xs[last], ys[i] - ys[last]
+        if math.sqrt(dx * dx + dy * dy) <= max_pixel_dist * (frame_ids[i] - frame_ids[last]):
+            keep.append(i)
+            last = i
+    gated[idx[keep]] = True
+    return gated
+
+def interpolate_gaps(bboxes, valid):
+    # linear over missing frames, held flat before the first and after the last detection
+    if not valid.any():
+        return np.full_like(bboxes, np.nan)
+    frames = np.arange(len(bboxes))
+    known = np.flatnonzero(valid)
+    return np.stack([np.interp(frames, known, bboxes[known, c]) for c in range(bboxes.shape[1])], axis=1)
+
+def kalman_smooth(bboxes, valid, process_var=1.0, measurement_var=4.0):
+    """
+    Constant-velocity Kalman filter with a Rauch-Tung-Striebel backward pass over the box centers,
+    x and y filtered together. Frames without a detection are predicted only. Box sizes are interpolated.
+    """
+    if not valid.any():
+        return np.full_like(bboxes, np.nan)
+
+    n = len(bboxes)
+    sizes = interpolate_gaps(bboxes[:, 2:] - bboxes[:, :2], valid)
+    centers = (bboxes[:, :2] + bboxes[:, 2:]) / 2
+
+    F = np.array([[1.0, 1.0], [0.0, 1.0]])
+    Q = process_var * np.array([[0.25, 0.5], [0.5, 1.0]])
+    # state per axis: (position, velocity), both axes share F, Q and R so they are stacked as (2, 2) / (2, 2, 2)
+    first = np.flatnonzero(valid)[0]
+    x = np.stack([centers[first], np.zeros(2)], axis=1) # (axis, state)
+    P = np.tile(np.diag([measurement_var, 100.0]), (2, 1, 1))
+
+    xs_pred = np.empty((n, 2, 2))
+    Ps_pred = np.empty((n, 2, 2, 2))
+    xs = np.empty((n, 2, 2))
+    Ps = np.empty((n, 2, 2, 2))
+    for t in range(n):
+        if t > 0:
+            x = x @ F.T
+            P = F @ P @ F.T + Q
+        xs_pred[t], Ps_pred[t] = x, P
+        if valid[t]:
+            # H = [1, 0], the position is observed
+            S = P[:, 0, 0] + measurement_var
+            K = P[:, :, 0] / S[:, None]
+            x = x + K * (centers[t] - x[:, 0])[:, None]
+            P = P - K[:, :, None] * P[:, None, 0, :]
+        xs[t], Ps[t] = x, P
+
+    for t in range(n - 2, -1, -1):
+        C = Ps[t] @ F.T @ np.linalg.inv(Ps_pred[t + 1])
+        xs[t] = xs[t] + np.einsum("aij,aj->ai", C, xs[t + 1] - xs_pred[t + 1])
+        Ps[t] = Ps[t] + C @ (Ps[t + 1] - Ps_pred[t + 1]) @ np.transpose(C, (0, 2, 1))
+
+    smoothed = xs[:, :, 0]
+    # before the first detection the filter has nothing to go on, hold the first smoothed position
+    smoothed[:first] = smoothed[first]
+    return np.hstack([smoothed - sizes / 2, smoothed + sizes / 2])
+
+def clean_ball_trajectory(bboxes, valid, max_pixel_dist=25, smoothing=None):
+    """Gates outliers and fills gaps, optionally smoothing with kalman_smooth. Returns (N, 4) boxes."""
+    valid = gate_detections(bboxes, valid, max_pixel_dist)
+    if smoothing == "kalman":
+        return kalman_smooth(bboxes, valid)
+    return interpolate_gaps(bboxes, valid)
@@ -0,0 +1,97 @@
+import os
+import cv2
+import yaml
+import numpy as np
+from pathlib import Path
+from ultralytics import YOLO
+
+# "torch" runs the .pt weights, "onnx" and "openvino" run exports of the same weights (CPU boxes without a GPU)
+ENGINES = ("torch", "onnx", "openvino")
+# only the OpenVINO exporter quantizes, the ONNX export ignores int8
+INT8_ENGINES = ("openvino",)
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "torch")
+INFERENCE_INT8 = os.getenv("INFERENCE_INT8", "0") == "1"
+# frames sampled from this video calibrate the INT8 activation ranges
+INT8_CALIBRATION_VIDEO = os.getenv("INT8_CALIBRATION_VIDEO")
+INT8_CALIBRATION_FRAMES = int(os.getenv("INT8_CALIBRATION_FRAMES", "300"))
+EXPORT_IMGSZ = int(os.getenv("EXPORT_IMGSZ", "640"))
+
+def build_calibration_dataset(video_path, out_dir, names, num_frames=300):
+    # evenly spaced frames written as an unlabeled YOLO dataset, the exporters only read the images
+    out_dir = Path(out_dir)
+    data_yaml = out_dir / "data.yaml"
+    if data_yaml.exists():
+        return data_yaml
+
+    image_dir = out_dir / "images" / "val"
+    image_dir.mkdir(parents=True, exist_ok=True)
+
+    capture = cv2.VideoCapture(str(video_path))
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total <= 0:
+        raise ValueError(f"Could not read calibration video {video_path}")
+    picked = set(np.linspace(0, total - 1, min(num_frames, total)).astype(int).tolist())
+
+    frame_id = 0
+    while True:
+        returned, frame = capture.read()
+        if not returned:
+            break
+        if frame_id in picked:
+            cv2.imwrite(str(image_dir / f"{frame_id:06d}.jpg"), frame)
+        frame_id += 1
+    capture.release()
+
+    with data_yaml.open("w") as f:
+        yaml.safe_dump({"path": str(out_dir), "train": "images/val", "val": "images/val", "names": names}, f)
+    return data_yaml
+
+def export_model(weights_path, engine="onnx", int8=False, calibration_video=None,
+                 calibration_frames=300, imgsz=640):
+    """Exports .pt weights once, next to the weights in the model cache, and returns the export path."""
+    weights_path = Path(weights_path)
+    suffix = f"{engine}{'_int8' if int8 else ''}_{imgsz}"
+    marker = weights_path.parent / f"{weights_path.stem}.{suffix}.path"
+    if marker.exists():
+        export_path = Path(marker.read_text().strip())
+        if export_path.exists():
+            return export_path
+
+    model = YOLO(weights_path)
+    kwargs = {"format": engine, "imgsz": imgsz}
+    if int8:
+        if calibration_video is None:
+            raise ValueError("INT8 export needs a calibration video (INT8_CALIBRATION_VIDEO)")
+        calibration_dir = weights_path.parent / f"calibration_{Path(calibration_video).stem}"
+        kwargs["int8"] = True
+        kwargs["data"] = str(build_calibration_dataset(calibration_video, calibration_dir, model.names,
+                                                       calibration_frames))
+
+    print(f"[Models] Exporting {weights_path} to {suffix}")
+    export_path = Path(model.export(**kwargs))
+    marker.write_text(str(export_path))
+    return export_path
+
+def load_model(weights_path, engine=None, int8=None, calibration_video=None, imgsz=None):
+    # same YOLO predict API for every engine, ultralytics picks the backend from the file format
+    engine = engine or INFERENCE_ENGINE
+    int8 = INFERENCE_INT8 if int8 is None else int8
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown inference engine {engine!r}, expected one of {ENGINES}")
+    if engine == "torch":
+        return YOLO(weights_path)
+    if int8 and engine not in INT8_ENGINES:
+        raise ValueError(f"INT8 inference is not supported for the {engine!r} engine, only for {INT8_ENGINES}")
+    # the exports are opt-in until bench_inference_engines numbers are recorded for the production weights
+    print(f"[Models] Using the {engine}{' int8' if int8 else ''} engine, its speed and detection agreement "
+          f"against torch are unmeasured (benchmarks/bench_inference_engines.py)")
+
+    export_path = export_model(
+        weights_path,
+        engine=engine,
+        int8=int8,
+        calibration_video=calibration_video or INT8_CALIBRATION_VIDEO,
+        calibration_frames=INT8_CALIBRATION_FRAMES,
+        imgsz=imgsz or EXPORT_IMGSZ,
+    )
+    return YOLO(export_path, task="detect")
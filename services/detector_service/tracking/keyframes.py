@@ -0,0 +1,111 @@
+import cv2
+import numpy as np
+
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+def to_gray(frame, scale=0.5):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if scale != 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray
+
+def track_points(prev_gray, gray, points, max_fb_error=1.0):
+    # pyramidal LK forward and back, points that do not return to where they started are dropped
+    points = points.reshape(-1, 1, 2).astype(np.float32)
+    moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, **LK_PARAMS)
+    back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, moved, None, **LK_PARAMS)
+    fb_error = np.linalg.norm(points - back, axis=2).ravel()
+    good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < max_fb_error)
+    return moved.reshape(-1, 2), good
+
+def global_motion(prev_gray, gray, max_points=200):
+    """Median displacement of corner features between two gray frames, in gray pixels."""
+    points = cv2.goodFeaturesToTrack(prev_gray, maxCorners=max_points, qualityLevel=0.01, minDistance=8)
+    if points is None:
+        return 0.0
+    moved, good = track_points(prev_gray, gray, points)
+    if not good.any():
+        return float("inf") # nothing could be followed, treat like a cut or a fast pan
+    return float(np.median(np.linalg.norm(moved[good] - points.reshape(-1, 2)[good], axis=1)))
+
+def propagate_boxes(prev_gray, gray, boxes, scale=0.5, grid=4):
+    """
+    Moves xyxy boxes (full resolution) by the median flow of a grid of points inside each box.
+    Returns the moved boxes and, per box, the fraction of its points that were tracked reliably.
+    """
+    if len(boxes) == 0:
+        return boxes, np.zeros(0, dtype=np.float32)
+
+    # grid x grid points per box, inset so background at the box edges weighs less
+    steps = (np.arange(grid, dtype=np.float32) + 0.5) / grid * 0.8 + 0.1
+    fx, fy = np.meshgrid(steps, steps)
+    scaled = boxes * scale
+    px = scaled[:, None, 0] + fx.ravel()[None, :] * (scaled[:, None, 2] - scaled[:, None, 0])
+    py = scaled[:, None, 1] + fy.ravel()[None, :] * (scaled[:, None, 3] - scaled[:, None, 1])
+    points = np.stack([px, py], axis=2).reshape(-1, 2)
+
+    moved, good = track_points(prev_gray, gray, points)
+    shift = (moved - points).reshape(len(boxes), grid * grid, 2)
+    good = good.reshape(len(boxes), grid * grid)
+
+    quality = good.mean(axis=1).astype(np.float32)
+    masked = np.where(good[:, :, None], shift, np.nan)
+    with np.errstate(all="ignore"):
+        median_shift = np.nanmedian(masked, axis=1) / scale
+    median_shift = np.nan_to_num(median_shift) # boxes with no tracked point stay where they were
+
+    new_boxes = boxes + np.tile(median_shift, 2)
+    return new_boxes.astype(boxes.dtype), quality
+
+class KeyframeScheduler():
+    """
+    Decides which frames go through the detector.
+    Runs every max_stride-th frame while the camera is steady and propagation is reliable, and falls
+    back to every frame during fast pans or once propagation quality drops, until cooldown calm frames pass.
+    """
+    def __init__(self, max_stride=1, pan_threshold=4.0, min_quality=0.6, cooldown=5, scale=0.25):
+        self.max_stride = max(1, max_stride)
+        self.pan_threshold = pan_threshold # gray pixels per frame at the given scale
+        self.min_quality = min_quality
+        self.cooldown = cooldown
+        self.scale = scale
+
+        self.prev_gray = None
+        self.stride = 1
+        self.since_keyframe = 0
+        self.calm_frames = 0
+        self.low_quality = False
+        self.num_keyframes = 0
+
+    @property
+    def enabled(self):
+        return self.max_stride > 1
+
+    def report_quality(self, quality):
+        # called by the tracking side with the propagation quality of the last frame
+        self.low_quality = quality < self.min_quality
+
+    def select(self, frames):
+        if not self.enabled:
+            self.num_keyframes += len(frames)
+            return [True] * len(frames)
+
+        keyframes = []
+        for frame in frames:
+            gray = to_gray(frame, self.scale)
+            panning = self.prev_gray is not None and global_motion(self.prev_gray, gray) > self.pan_threshold
+            self.prev_gray = gray
+
+            if panning or self.low_quality:
+                self.stride = 1
+                self.calm_frames = 0
+            else:
+                self.calm_frames += 1
+                if self.calm_frames >= self.cooldown:
+                    self.stride = self.max_stride
+
+            is_keyframe = self.num_keyframes == 0 or self.since_keyframe + 1 >= self.stride
+            self.since_keyframe = 0 if is_keyframe else self.since_keyframe + 1
+            self.num_keyframes += is_keyframe
+            keyframes.append(is_keyframe)
+        return keyframes
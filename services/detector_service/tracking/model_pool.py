@@ -0,0 +1,71 @@
+import os
+import time
+import queue
+from contextlib import contextmanager
+
+import numpy as np
+from prometheus_client import Gauge, Histogram
+from .engines import load_model
+
+POOL_SIZE = Gauge("detector_model_pool_size", "Number of preloaded model slots")
+POOL_AVAILABLE = Gauge("detector_model_pool_available", "Model slots not serving a request")
+POOL_WAIT = Histogram(
+    "detector_model_pool_wait_seconds",
+    "Time a request waited for a free model slot",
+    buckets=(0.01, 0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600),
+)
+
+def get_devices():
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+    except ImportError:
+        pass
+    return ["cpu"]
+
+def default_pool_size(devices):
+    # one slot per GPU, on CPU torch already uses several threads per model
+    if devices != ["cpu"]:
+        return len(devices)
+    return max(1, (os.cpu_count() or 1) // 4)
+
+class ModelSlot():
+    def __init__(self, player_model_path, ball_model_path, device, warmup_size=640):
+        self.device = device
+        # torch, onnx or openvino depending on INFERENCE_ENGINE
+        self.player_model = load_model(player_model_path)
+        self.ball_model = load_model(ball_model_path)
+
+        # first predict builds the predictor and runs CUDA/cuDNN setup, keep that out of requests
+        blank = np.zeros((warmup_size, warmup_size, 3), dtype=np.uint8)
+        self.player_model.predict([blank], device=device, verbose=False)
+        self.ball_model.predict([blank], device=device, verbose=False)
+
+class ModelPool():
+    def __init__(self, player_model_path, ball_model_path, size=None):
+        devices = get_devices()
+        size = size or default_pool_size(devices)
+
+        self.slots = queue.Queue()
+        for i in range(size):
+            device = devices[i % len(devices)]
+            print(f"[Models] Loading model slot {i + 1}/{size} on {device}")
+            self.slots.put(ModelSlot(player_model_path, ball_model_path, device))
+
+        self.size = size
+        POOL_SIZE.set(size)
+        POOL_AVAILABLE.set(size)
+
+    @contextmanager
+    def acquire(self):
+        # blocks until a slot is free, requests are served in arrival order
+        start = time.perf_counter()
+        slot = self.slots.get()
+        POOL_WAIT.observe(time.perf_counter() - start)
+        POOL_AVAILABLE.dec()
+        try:
+            yield slot
+        finally:
+            self.slots.put(slot)
+            POOL_AVAILABLE.inc()
@@ -0,0 +1,100 @@
+import queue
+import threading
+import numpy as np
+
+_DONE = object()
+
+def iter_frame_batches(frames, batch_size=20):
+    # copies each batch out of the (memory-mapped) frame store, the page reads happen on the prefetch thread
+    for i in range(0, len(frames), batch_size):
+        yield np.array(frames[i:i+batch_size])
+
+def _put(q, item, stop):
+    # gives up once the pipeline is stopped, so a failing stage never leaves another one blocked
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+def track_frames(player_tracker, ball_tracker, frame_batches, queue_depth=4, on_batch=None):
+    """
+    Streams frame batches through both models in one pass.
+    Batches are read ahead on a prefetch thread, each batch is run through the player and ball
+    models, and ByteTrack is updated on a third thread while the next batch is detected.
+    At most queue_depth batches wait between stages, so with keyframes enabled the propagation
+    quality reaches the scheduler up to queue_depth batches late.
+    Player tracks come back as per-frame (track_ids, bboxes) arrays, ball tracks as per-frame dicts.
+    on_batch(start_frame, frame_arrays) is called from the tracking thread as soon as a batch of
+    player tracks is final.
+    """
+    stop = threading.Event()
+    batches = queue.Queue(maxsize=queue_depth)
+    detections = queue.Queue(maxsize=queue_depth)
+    errors = []
+
+    player_tracks = []
+    ball_tracks = []
+
+    def prefetch():
+        try:
+            for batch in frame_batches:
+                if not _put(batches, batch, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        _put(batches, _DONE, stop)
+
+    def update_tracks():
+        try:
+            while True:
+                item = _get(detections, stop)
+                if item is _DONE:
+                    return
+                batch, player_detections = item
+                start_frame = len(player_tracks)
+                # ByteTrack is stateful, frames are fed strictly in order
+                for detection, frame in zip(player_detections, batch):
+                    player_tracks.append(player_tracker.get_frame_arrays(detection, frame))
+                if on_batch is not None:
+                    on_batch(start_frame, player_tracks[start_frame:])
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    prefetch_thread = threading.Thread(target=prefetch, daemon=True)
+    tracking_thread = threading.Thread(target=update_tracks, daemon=True)
+    prefetch_thread.start()
+    tracking_thread.start()
+
+    try:
+        while True:
+            batch = _get(batches, stop)
+            if batch is _DONE:
+                break
+            # player detections are None on frames that are not keyframes, see KeyframeScheduler
+            batch_detections = (batch, player_tracker.detect_keyframes(batch))
+            # the ball is picked right away, ROI search needs the previous frame's result
+            ball_tracks.extend(ball_tracker.get_batch_tracks(batch))
+            if not _put(detections, batch_detections, stop):
+                break
+        _put(detections, _DONE, stop)
+        tracking_thread.join()
+    finally:
+        stop.set()
+        prefetch_thread.join()
+
+    if errors:
+        raise errors[0]
+    return player_tracks, ball_tracks
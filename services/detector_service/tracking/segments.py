@@ -0,0 +1,167 @@
+import os
+import numpy as np
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import linear_sum_assignment
+
+from shared.frame_store import open_frames
+from shared.utils import box_iou
+from .engines import load_model
+from .pipeline import track_frames, iter_frame_batches
+from .track_players import PlayerTracker
+from .track_ball import BallTracker
+
+def split_segments(num_frames, num_segments, overlap):
+    """(start, end) frame ranges covering the video, consecutive segments share overlap frames."""
+    num_segments = max(1, min(num_segments, num_frames // max(2 * overlap, 1)))
+    if num_segments == 1:
+        return [(0, num_frames)]
+    length = -(-(num_frames + (num_segments - 1) * overlap) // num_segments)
+    segments = []
+    for i in range(num_segments):
+        start = i * (length - overlap)
+        segments.append((start, min(start + length, num_frames)))
+    return segments
+
+def match_track_ids(prev_frames, next_frames, min_iou=0.5, min_shared=0.3):
+    """
+    Maps track ids of next_frames onto ids of prev_frames covering the same overlap frames.
+    Tracks are paired by their mean IoU over the overlap (Hungarian assignment), pairs below min_iou
+    or seen together in less than min_shared of the overlap are left unmatched.
+    """
+    prev_ids = np.unique(np.concatenate([ids for ids, _ in prev_frames] + [np.empty(0, dtype=np.int32)]))
+    next_ids = np.unique(np.concatenate([ids for ids, _ in next_frames] + [np.empty(0, dtype=np.int32)]))
+    if len(prev_ids) == 0 or len(next_ids) == 0:
+        return {}
+
+    iou_sum = np.zeros((len(prev_ids), len(next_ids)))
+    shared = np.zeros((len(prev_ids), len(next_ids)))
+    for (p_ids, p_boxes), (n_ids, n_boxes) in zip(prev_frames, next_frames):
+        if len(p_ids) == 0 or len(n_ids) == 0:
+            continue
+        rows = np.searchsorted(prev_ids, p_ids)
+        cols = np.searchsorted(next_ids, n_ids)
+        iou_sum[np.ix_(rows, cols)] += box_iou(p_boxes, n_boxes)
+        shared[np.ix_(rows, cols)] += 1
+
+    mean_iou = iou_sum / np.maximum(shared, 1)
+    rows, cols = linear_sum_assignment(-mean_iou)
+    keep = (mean_iou[rows, cols] >= min_iou) & (shared[rows, cols] >= min_shared * len(prev_frames))
+    return dict(zip(next_ids[cols[keep]].tolist(), prev_ids[rows[keep]].tolist()))
+
+def remap_frames(frame_arrays, id_map):
+    remapped = []
+    for ids, boxes in frame_arrays:
+        remapped.append((np.array([id_map[i] for i in ids.tolist()], dtype=np.int32), boxes))
+    return remapped
+
+class TrackStitcher():
+    """Joins per-segment player tracks, in segment order, into one table with globally consistent ids."""
+    def __init__(self, segments):
+        self.segments = segments
+        self.prev = None # frames of the last segment, already in global ids
+        self.prev_start = 0
+        self.next_id = 1
+        self.done = 0 # frames handed out so far
+
+    def add(self, index, frame_arrays):
+        # returns (start_frame, frame_arrays) of the frames that became final with this segment
+        start, end = self.segments[index]
+        id_map = {}
+        if self.prev is not None:
+            overlap_end = self.segments[index - 1][1]
+            id_map = match_track_ids(self.prev[start - self.prev_start:], frame_arrays[:overlap_end - start])
+
+        # tracks that were not matched in the overlap are new players
+        for ids, _ in frame_arrays:
+            for track_id in ids.tolist():
+                if track_id not in id_map:
+                    id_map[track_id] = self.next_id
+                    self.next_id += 1
+
+        emitted_start, emitted = self.done, []
+        if self.prev is not None:
+            # the previous segment is used up to the middle of the overlap, this one from there on
+            cut = (start + self.segments[index - 1][1]) // 2
+            emitted = self.prev[self.done - self.prev_start:cut - self.prev_start]
+            self.done = cut
+
+        self.prev = remap_frames(frame_arrays, id_map)
+        self.prev_start = start
+        return emitted_start, emitted
+
+    def finish(self):
+        emitted_start = self.done
+        emitted = self.prev[self.done - self.prev_start:]
+        self.done += len(emitted)
+        return emitted_start, emitted
+
+_worker = {}
+
+def _init_worker(player_model_path, ball_model_path, player_kwargs, ball_kwargs, torch_threads):
+    # runs once per process, the models stay loaded for every segment this process tracks
+    import torch
+    torch.set_num_threads(torch_threads)
+    _worker["player_model"] = load_model(player_model_path)
+    _worker["ball_model"] = load_model(ball_model_path)
+    _worker["player_kwargs"] = player_kwargs
+    _worker["ball_kwargs"] = ball_kwargs
+
+def _track_segment(video_digest, start, end, batch_size, queue_depth):
+    # frames are mapped from the frame store, nothing but the digest crosses the process boundary
+    frames = open_frames(video_digest)[start:end]
+    player_tracker = PlayerTracker(model=_worker["player_model"], **_worker["player_kwargs"])
+    ball_tracker = BallTracker(model=_worker["ball_model"], **_worker["ball_kwargs"])
+    return track_frames(player_tracker, ball_tracker, iter_frame_batches(frames, batch_size), queue_depth)
+
+class SegmentTracker():
+    """
+    Tracks a video as overlapping segments on a pool of processes, each with its own models and
+    ByteTrack, and stitches the player ids across the overlaps.
+    """
+    def __init__(self, player_model_path, ball_model_path, num_workers, overlap=30, batch_size=20,
+                 queue_depth=4, player_kwargs=None, ball_kwargs=None):
+        self.num_workers = num_workers
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.queue_depth = queue_depth
+        torch_threads = max(1, (os.cpu_count() or 1) // num_workers)
+        # spawn, forked children cannot use CUDA and would inherit the parent's model pool
+        self.executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(player_model_path, ball_model_path, player_kwargs or {}, ball_kwargs or {}, torch_threads),
+        )
+
+    def track(self, video_digest, num_frames, on_batch=None):
+        segments = split_segments(num_frames, self.num_workers, self.overlap)
+        futures = [
+            self.executor.submit(_track_segment, video_digest, start, end, self.batch_size, self.queue_depth)
+            for start, end in segments
+        ]
+
+        stitcher = TrackStitcher(segments)
+        player_frame_arrays, ball_tracks = [], []
+        for index, future in enumerate(futures):
+            frame_arrays, segment_ball_tracks = future.result()
+
+            emitted = [stitcher.add(index, frame_arrays)]
+            if index == len(segments) - 1:
+                emitted.append(stitcher.finish())
+            for start_frame, final_frames in emitted:
+                if not final_frames:
+                    continue
+                player_frame_arrays += final_frames
+                if on_batch is not None:
+                    on_batch(start_frame, final_frames)
+
+            # the ball has no ids, each segment fills the frames up to where the next one starts
+            seg_start, seg_end = segments[index]
+            next_start = segments[index + 1][0] if index + 1 < len(segments) else seg_end
+            ball_tracks += segment_ball_tracks[len(ball_tracks) - seg_start:next_start - seg_start]
+
+        return player_frame_arrays, ball_tracks
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
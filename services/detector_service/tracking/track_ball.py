@@ -1,76 +1,137 @@
 from ultralytics import YOLO
 import supervision as sv
 import numpy as np
-import pandas as pd
 import sys
 sys.path.append("../")
+from .ball_trajectory import ball_tracks_to_array, array_to_ball_tracks, gate_detections, interpolate_gaps
 
 class BallTracker():
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path=None, model=None, device=None, roi_size=0, max_misses=3, fallback="full",
+                 tile_size=640):
+        self.model = model if model is not None else YOLO(model_path)
+        self.device = device
+
+        # roi_size > 0 searches a roi_size crop around the predicted ball position at native resolution,
+        # the whole frame ("full") or overlapping tiles ("tiled") are only searched once the ball is lost
+        self.roi_size = roi_size
+        self.max_misses = max_misses
+        self.fallback = fallback
+        self.tile_size = tile_size
+        self.history = [] # (frame_id, center) of the last two detections
+        self.misses = 0
+        self.frame_id = 0
+        self.num_full_searches = 0
+        self.class_names = None
+        self.ball_class_id = None
+
+    def detect_batch(self, batch_frames, min_conf=0.5, imgsz=None):
+        kwargs = {} if imgsz is None else {"imgsz": imgsz}
+        return self.model.predict(list(batch_frames), conf=min_conf, device=self.device, **kwargs)
 
     def detect_frames(self, vid_frames, batch_size=20, min_conf=0.5):
         detections = []
         for i in range(0, len(vid_frames), batch_size):
-            batch_frames = vid_frames[i:i+batch_size]
-            batch_detections = self.model.predict(batch_frames, conf=min_conf)
-            detections += batch_detections
+            detections += self.detect_batch(vid_frames[i:i+batch_size], min_conf=min_conf)
         return detections
-    
-    def get_object_tracks(self, vid_frames):
-        detections = self.detect_frames(vid_frames)
-        
-        tracks = []
-        for frame_id, detection in enumerate(detections):
-            class_names =  detection.names
-            class_names_inv = {val:key for key,val in class_names.items()}  
-            detection_sv = sv.Detections.from_ultralytics(detection)
-            tracks.append({})
-            
-            # pick the basketball bbox with the highest conf.
-            picked_bbox = None
-            max_conf = 0
-            for frame_detection in detection_sv:
-                bbox = frame_detection[0].tolist()
-                class_id = frame_detection[3]
-                conf = frame_detection[2]
-
-                if class_id == class_names_inv["basketball"]:
-                    if max_conf < conf:
-                        picked_bbox = bbox
-                        max_conf = conf
-            if picked_bbox is not None:
-                tracks[frame_id][1] = {"bbox": picked_bbox}
 
-        return tracks
-    
-    def remove_incorrect_detections(self, ball_positions):
-        max_permitted_pixel_dist = 25
-        prev_good_frame_idx = -1
-
-        for i in range(len(ball_positions)):
-            curr_bbox = ball_positions[i].get(1, {}).get("bbox", [])
-            # no detected basketball
-            if len(curr_bbox) == 0:
-                continue
-            # first detection of basketball
-            if prev_good_frame_idx == -1:
-                prev_good_frame_idx = i
-                continue
-            prev_good_bbox = ball_positions[prev_good_frame_idx].get(1, {}).get("bbox", [])
-            frame_gap = i - prev_good_frame_idx
-            adjusted_max_dist = max_permitted_pixel_dist * frame_gap
-            if np.linalg.norm(np.array(prev_good_bbox[:2]) - np.array(curr_bbox[:2])) > adjusted_max_dist:
-                ball_positions[i] = {}
+    def set_class_names(self, class_names):
+        if class_names is not self.class_names:
+            self.class_names = class_names
+            self.ball_class_id = {val:key for key,val in class_names.items()}["basketball"]
+
+    def pick_from_detections(self, detection_sv, offset=(0, 0)):
+        # the basketball bbox with the highest conf., shifted by the crop offset
+        conf = np.where(detection_sv.class_id == self.ball_class_id, detection_sv.confidence, 0)
+        if len(conf) == 0 or conf.max() <= 0:
+            return None, 0
+        best = int(np.argmax(conf))
+        ox, oy = offset
+        return (detection_sv.xyxy[best] + (ox, oy, ox, oy)).tolist(), float(conf[best])
+
+    def pick_ball(self, detection, offset=(0, 0)):
+        self.set_class_names(detection.names)
+        return self.pick_from_detections(sv.Detections.from_ultralytics(detection), offset)
+
+    def get_frame_tracks(self, detection):
+        picked_bbox, _ = self.pick_ball(detection)
+        if picked_bbox is None:
+            return {}
+        return {1: {"bbox": picked_bbox}}
+
+    def predict_center(self):
+        # constant velocity from the last two detections, or the last position when there is only one
+        if not self.history:
+            return None
+        last_frame, last_center = self.history[-1]
+        if len(self.history) < 2:
+            return last_center
+        prev_frame, prev_center = self.history[-2]
+        velocity = (last_center - prev_center) / (last_frame - prev_frame)
+        return last_center + velocity * (self.frame_id - last_frame)
+
+    def search_roi(self, frame, center):
+        # crop grows with every miss so a ball that changed direction can still be caught
+        h, w = frame.shape[:2]
+        size = int(self.roi_size * (1 + 0.5 * self.misses))
+        size = min(-(-size // 32) * 32, w - w % 32, h - h % 32)
+        x1 = int(np.clip(center[0] - size / 2, 0, w - size))
+        y1 = int(np.clip(center[1] - size / 2, 0, h - size))
+        crop = frame[y1:y1+size, x1:x1+size]
+        bbox, _ = self.pick_ball(self.detect_batch([crop], imgsz=size)[0], offset=(x1, y1))
+        return bbox
+
+    def search_tiles(self, frame):
+        h, w = frame.shape[:2]
+        size = min(self.tile_size, h, w)
+        step = size - size // 8 # tiles overlap so a ball on a border is whole in one of them
+        origins = [(x, y) for y in range(0, max(h - size, 0) + step, step) for x in range(0, max(w - size, 0) + step, step)]
+        origins = [(min(x, w - size), min(y, h - size)) for x, y in origins]
+        crops = [frame[y:y+size, x:x+size] for x, y in origins]
+
+        best_bbox, best_conf = None, 0
+        for detection, origin in zip(self.detect_batch(crops, imgsz=size), origins):
+            bbox, conf = self.pick_ball(detection, offset=origin)
+            if bbox is not None and conf > best_conf:
+                best_bbox, best_conf = bbox, conf
+        return best_bbox
+
+    def get_roi_frame_tracks(self, frame):
+        center = self.predict_center() if self.misses <= self.max_misses else None
+        bbox = self.search_roi(frame, center) if center is not None else None
+
+        if bbox is None and center is None:
+            # ball lost, search everything until it is found again
+            self.num_full_searches += 1
+            if self.fallback == "tiled":
+                bbox = self.search_tiles(frame)
             else:
-                prev_good_frame_idx = i
+                bbox, _ = self.pick_ball(self.detect_batch([frame])[0])
+
+        if bbox is None:
+            self.misses += 1
+        else:
+            self.misses = 0
+            center = np.array([(bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2])
+            self.history = (self.history + [(self.frame_id, center)])[-2:]
+        self.frame_id += 1
+        return {} if bbox is None else {1: {"bbox": bbox}}
+
+    def get_batch_tracks(self, batch_frames):
+        # ROI search depends on the previous frame, so it runs frame by frame
+        if self.roi_size:
+            return [self.get_roi_frame_tracks(frame) for frame in batch_frames]
+        return [self.get_frame_tracks(detection) for detection in self.detect_batch(batch_frames)]
 
-        return ball_positions
+    def get_object_tracks(self, vid_frames, batch_size=20):
+        tracks = []
+        for i in range(0, len(vid_frames), batch_size):
+            tracks += self.get_batch_tracks(vid_frames[i:i+batch_size])
+        return tracks
+
+    def remove_incorrect_detections(self, ball_positions):
+        bboxes, valid = ball_tracks_to_array(ball_positions)
+        return array_to_ball_tracks(bboxes, gate_detections(bboxes, valid, max_pixel_dist=25))
     
     def interp_ball_pos(self, ball_positions):
-        ball_positions = [pos.get(1, {}).get("bbox", []) for pos in ball_positions]
-        df_ball_positions = pd.DataFrame(ball_positions, columns=["x1", "y1", "x2", "y2"])
-        df_ball_positions = df_ball_positions.interpolate()
-        df_ball_positions = df_ball_positions.bfill()
-        ball_positions = [{1:{"bbox": pos}} for pos in df_ball_positions.to_numpy().tolist()]
-        return ball_positions
\ No newline at end of file
+        bboxes, valid = ball_tracks_to_array(ball_positions)
+        return array_to_ball_tracks(interpolate_gaps(bboxes, valid))
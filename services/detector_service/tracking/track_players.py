@@ -1,40 +1,97 @@
 from ultralytics import YOLO
 import supervision as sv
+import numpy as np
 import sys
 sys.path.append("../")
+from shared.utils import frame_arrays_to_tracks
+from .keyframes import KeyframeScheduler, to_gray, propagate_boxes
 
 class PlayerTracker():
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path=None, model=None, device=None, keyframe_stride=1, flow_scale=0.5):
+        # a preloaded model can be shared between requests, the ByteTrack state is per instance
+        self.model = model if model is not None else YOLO(model_path)
+        self.device = device
         self.tracker = sv.ByteTrack()
 
+        # keyframe_stride > 1 only runs the detector on keyframes, boxes are moved by optical flow in between
+        self.scheduler = KeyframeScheduler(max_stride=keyframe_stride)
+        self.flow_scale = flow_scale
+        self.prev_gray = None
+        self.last_detections = None
+        self.class_names = None
+        self.player_class_id = None
+
+    def detect_batch(self, batch_frames, min_conf=0.3):
+        return self.model.predict(list(batch_frames), conf=min_conf, device=self.device)
+
     def detect_frames(self, vid_frames, batch_size=20, min_conf=0.5):
         detections = []
         for i in range(0, len(vid_frames), batch_size):
-            batch_frames = vid_frames[i:i+batch_size]
-            batch_detections = self.model.predict(batch_frames, conf=min_conf)
-            detections += batch_detections
+            detections += self.detect_batch(vid_frames[i:i+batch_size], min_conf=min_conf)
         return detections
     
-    def get_object_tracks(self, vid_frames):
+    def detect_keyframes(self, batch_frames, min_conf=0.3):
+        # one entry per frame, None for frames that get propagated boxes instead of a detector pass
+        keyframes = self.scheduler.select(batch_frames)
+        detections = iter(self.detect_batch([f for f, k in zip(batch_frames, keyframes) if k], min_conf=min_conf)
+                          if any(keyframes) else [])
+        return [next(detections) if k else None for k in keyframes]
+
+    def propagate_detections(self, gray):
+        boxes, quality = propagate_boxes(self.prev_gray, gray, self.last_detections.xyxy, scale=self.flow_scale)
+        self.scheduler.report_quality(float(quality.mean()) if len(quality) else 1.0)
+
+        # boxes whose points were all lost are dropped, ByteTrack keeps their tracks alive for a while
+        keep = quality > 0.25
+        return sv.Detections(
+            xyxy=boxes[keep],
+            confidence=self.last_detections.confidence[keep],
+            class_id=self.last_detections.class_id[keep],
+        )
 
-        detections = self.detect_frames(vid_frames, min_conf=0.3)
+    def set_class_names(self, class_names):
+        # the class lookup only changes with the model, not per frame
+        if class_names is not self.class_names:
+            self.class_names = class_names
+            self.player_class_id = {val:key for key,val in class_names.items()}["Player"]
 
-        tracks = []
-        for frame_id, detection in enumerate(detections):
-            class_names =  detection.names
-            class_names_inv = {val:key for key,val in class_names.items()}  
+    def extract_tracks(self, detection_with_tracks):
+        # (track_ids, bboxes) of the players in one frame, as int32 (K,) and float32 (K, 4) arrays
+        if self.player_class_id is None or len(detection_with_tracks) == 0:
+            return np.empty(0, dtype=np.int32), np.empty((0, 4), dtype=np.float32)
+        mask = detection_with_tracks.class_id == self.player_class_id
+        return (
+            detection_with_tracks.tracker_id[mask].astype(np.int32),
+            detection_with_tracks.xyxy[mask].astype(np.float32),
+        )
+
+    def get_frame_arrays(self, detection, frame=None):
+        # updates ByteTrack with one frame of detections, frames must arrive in order
+        gray = to_gray(frame, self.flow_scale) if self.scheduler.enabled and frame is not None else None
+
+        if detection is not None:
+            self.set_class_names(detection.names)
             detection_sv = sv.Detections.from_ultralytics(detection)
-            detection_with_tracks = self.tracker.update_with_detections(detection_sv)
-            
-            tracks.append({})
+        elif self.last_detections is not None and self.prev_gray is not None and gray is not None:
+            detection_sv = self.propagate_detections(gray)
+        else:
+            detection_sv = sv.Detections.empty()
+
+        self.prev_gray = gray
+        self.last_detections = detection_sv
+        return self.extract_tracks(self.tracker.update_with_detections(detection_sv))
 
-            for frame_detection in detection_with_tracks:
-                bbox = frame_detection[0].tolist()
-                class_id = frame_detection[3]
-                track_id = frame_detection[4]
+    def get_frame_tracks(self, detection, frame=None):
+        track_ids, bboxes = self.get_frame_arrays(detection, frame)
+        return frame_arrays_to_tracks([(track_ids, bboxes)])[0]
 
-                if class_id == class_names_inv["Player"]:
-                    tracks[frame_id][track_id] = {"bbox": bbox}
+    def get_object_arrays(self, vid_frames, batch_size=20):
+        frame_arrays = []
+        for i in range(0, len(vid_frames), batch_size):
+            batch_frames = vid_frames[i:i+batch_size]
+            detections = self.detect_keyframes(batch_frames)
+            frame_arrays += [self.get_frame_arrays(detection, frame) for detection, frame in zip(detections, batch_frames)]
+        return frame_arrays
 
-        return tracks
\ No newline at end of file
+    def get_object_tracks(self, vid_frames, batch_size=20):
+        return frame_arrays_to_tracks(self.get_object_arrays(vid_frames, batch_size))
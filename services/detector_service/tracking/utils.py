@@ -1,5 +1,11 @@
 import os
+import json
+import base64
+import shutil
+import hashlib
+import tempfile
 import wandb
+import requests
 from pathlib import Path
 
 import sys
@@ -7,86 +13,120 @@ sys.path.append("../")
 from dotenv import load_dotenv
 load_dotenv()
 
-def get_player_production_model_path():
-    load_dotenv()
-    key = os.getenv("WNB_API_TOKEN")
-    if key is None:
-        raise EnvironmentError("Environment variable WNB_API_TOKEN is not set")
-
-    wandb.login(key=key)
-
-    artifact_ref = (
-        "mosmar99-j-nk-ping-university-org/"
-        "wandb-registry-model/player-detection:production"
-    )
-
-    api = wandb.Api()
-    artifact = api.artifact(artifact_ref, type="model")
-
-  # 3) Resolve <project_root>/models/prod
-    project_root = Path(__file__).resolve().parent.parent
-    models_root = project_root / "models"
-    prod_dir = models_root / "prod" / "player"
-    prod_dir.mkdir(parents=True, exist_ok=True)
-
-    # 4) Clear old prod weights
-    for p in prod_dir.glob("*.pt"):
-        p.unlink()
+REGISTRY = "mosmar99-j-nk-ping-university-org/wandb-registry-model"
+
+# weights are cached under <MODEL_CACHE_DIR>/<kind>/<artifact digest>/, a digest never changes content
+MODEL_CACHE_DIR = Path(os.getenv("MODEL_CACHE_DIR", Path(__file__).resolve().parent.parent / "models" / "cache"))
+# "production" follows the registry alias, "v3" pins a version
+PLAYER_MODEL_VERSION = os.getenv("PLAYER_MODEL_VERSION", "production")
+BALL_MODEL_VERSION = os.getenv("BALL_MODEL_VERSION", "production")
+# skip the registry entirely and use the last verified weights
+MODEL_OFFLINE = os.getenv("MODEL_OFFLINE", "0") == "1"
+MODEL_REGISTRY_TIMEOUT = int(os.getenv("MODEL_REGISTRY_TIMEOUT", "10"))
+# the registry being unreachable or refusing us falls back to the cache, a bad download does not
+REGISTRY_ERRORS = (wandb.errors.CommError, wandb.errors.UsageError, requests.RequestException, ConnectionError, TimeoutError)
+
+def _md5_b64(path):
+    # same checksum format as the W&B artifact manifest
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            md5.update(block)
+    return base64.b64encode(md5.digest()).decode("ascii")
+
+def _verified_weights(entry_dir):
+    # returns the weights path of a cache entry if its checksum still matches, None otherwise
+    manifest_path = entry_dir / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    with manifest_path.open() as f:
+        manifest = json.load(f)
+    weights_path = entry_dir / manifest["weights"]
+    if not weights_path.exists() or _md5_b64(weights_path) != manifest["md5"]:
+        print(f"[Models] Checksum mismatch for cached weights in {entry_dir}")
+        return None
+    return weights_path
 
-    # 5) Download artifact directly into prod_dir
-    download_dir = Path(artifact.download(root=str(prod_dir)))
+def _download_entry(artifact, kind_dir):
+    weights_entries = [(name, entry) for name, entry in artifact.manifest.entries.items() if name.endswith(".pt")]
+    if not weights_entries:
+        raise FileNotFoundError(f"No .pt weights found in artifact {artifact.name}")
+    name, entry = weights_entries[0]
 
-    # Depending on W&B, download_dir may be prod_dir itself or a subfolder;
-    # just search inside prod_dir for a .pt file.
+    # download next to the final location and rename, an interrupted download never looks cached
+    tmp_dir = Path(tempfile.mkdtemp(dir=kind_dir, prefix=".download-"))
     try:
-        weights_path = next(prod_dir.rglob("*.pt"))
-    except StopIteration:
-        raise FileNotFoundError(
-            f"No .pt weights found in downloaded artifact under {prod_dir}"
-        )
+        artifact.download(root=str(tmp_dir))
+        weights_path = tmp_dir / name
+        md5 = _md5_b64(weights_path)
+        if md5 != entry.digest:
+            raise ValueError(f"Checksum mismatch for {artifact.name}: expected {entry.digest}, got {md5}")
 
-    print(f"[W&B] Production model stored at {weights_path}, size={weights_path.stat().st_size} bytes")
+        with (tmp_dir / "manifest.json").open("w") as f:
+            json.dump({"artifact": artifact.name, "digest": artifact.digest, "weights": name, "md5": md5}, f)
 
-    return weights_path
+        entry_dir = kind_dir / artifact.digest
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
-def get_ball_production_model_path():
-    load_dotenv()
+    return entry_dir / name
+
+def _resolve_online(model_name, version, kind_dir):
     key = os.getenv("WNB_API_TOKEN")
     if key is None:
         raise EnvironmentError("Environment variable WNB_API_TOKEN is not set")
 
     wandb.login(key=key)
+    api = wandb.Api(timeout=MODEL_REGISTRY_TIMEOUT)
+    # metadata only, the weights are downloaded when the digest is not cached yet
+    artifact = api.artifact(f"{REGISTRY}/{model_name}:{version}", type="model")
+
+    weights_path = _verified_weights(kind_dir / artifact.digest)
+    if weights_path is None:
+        print(f"[W&B] Downloading {artifact.name} ({artifact.digest})")
+        weights_path = _download_entry(artifact, kind_dir)
+    else:
+        print(f"[W&B] {artifact.name} ({artifact.digest}) already cached")
+
+    with (kind_dir / f"{version}.json").open("w") as f:
+        json.dump({"digest": artifact.digest, "artifact": artifact.name}, f)
+    return weights_path
 
-    artifact_ref = (
-        "mosmar99-j-nk-ping-university-org/"
-        "wandb-registry-model/ball-detection:production"
-    )
-
-    api = wandb.Api()
-    artifact = api.artifact(artifact_ref, type="model")
-
-  # 3) Resolve <project_root>/models/prod
-    project_root = Path(__file__).resolve().parent.parent
-    models_root = project_root / "models"
-    prod_dir = models_root / "prod" / "ball"
-    prod_dir.mkdir(parents=True, exist_ok=True)
+def _resolve_offline(model_name, version, kind_dir):
+    # last digest that was verified for this version, written by _resolve_online
+    pointer_path = kind_dir / f"{version}.json"
+    if not pointer_path.exists():
+        raise FileNotFoundError(f"No cached {model_name}:{version} weights under {kind_dir}")
+    with pointer_path.open() as f:
+        pointer = json.load(f)
+
+    weights_path = _verified_weights(kind_dir / pointer["digest"])
+    if weights_path is None:
+        raise FileNotFoundError(f"Cached {pointer['artifact']} weights failed verification")
+    print(f"[Models] Using cached {pointer['artifact']} ({pointer['digest']}) offline")
+    return weights_path
 
-    # 4) Clear old prod weights
-    for p in prod_dir.glob("*.pt"):
-        p.unlink()
+def get_production_model_path(model_name, kind, version="production"):
+    kind_dir = MODEL_CACHE_DIR / kind
+    kind_dir.mkdir(parents=True, exist_ok=True)
 
-    # 5) Download artifact directly into prod_dir
-    download_dir = Path(artifact.download(root=str(prod_dir)))
+    if not MODEL_OFFLINE and os.getenv("WNB_API_TOKEN") is None:
+        print(f"[W&B] WNB_API_TOKEN is not set, using the local cache for {model_name}:{version}")
+    elif not MODEL_OFFLINE:
+        try:
+            weights_path = _resolve_online(model_name, version, kind_dir)
+            print(f"[W&B] Production model stored at {weights_path}, size={weights_path.stat().st_size} bytes")
+            return weights_path
+        except REGISTRY_ERRORS as e:
+            # checksum mismatches of a fresh download and missing weights in the artifact still raise
+            print(f"[W&B] Registry lookup for {model_name}:{version} failed ({e!r}), falling back to the local cache")
 
-    # Depending on W&B, download_dir may be prod_dir itself or a subfolder;
-    # just search inside prod_dir for a .pt file.
-    try:
-        weights_path = next(prod_dir.rglob("*.pt"))
-    except StopIteration:
-        raise FileNotFoundError(
-            f"No .pt weights found in downloaded artifact under {prod_dir}"
-        )
+    return _resolve_offline(model_name, version, kind_dir)
 
-    print(f"[W&B] Production model stored at {weights_path}, size={weights_path.stat().st_size} bytes")
+def get_player_production_model_path():
+    return get_production_model_path("player-detection", "player", PLAYER_MODEL_VERSION)
 
-    return weights_path
+def get_ball_production_model_path():
+    return get_production_model_path("ball-detection", "ball", BALL_MODEL_VERSION)
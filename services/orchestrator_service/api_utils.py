@@ -2,6 +2,7 @@ import os
 import json
 import requests
 from .config import CONFIG
+from shared.utils import TRACKS_MEDIA_TYPE, encode_tracks, decode_tracks, arrays_to_tracks
 
 def id_to_team_ball_acquisition(ball_acq_list, team_assignments):
     team_possession = []
@@ -15,27 +16,82 @@ def id_to_team_ball_acquisition(ball_acq_list, team_assignments):
 
     return team_possession
 
-def get_team_assignments_from_service(local_video_path: str, player_tracks):
+def get_team_assignments_from_service(video_uri: str, video_hash: str, player_tracks, game_id: str = None):
     url = CONFIG.assigner_url
-    tracks_json_str = json.dumps(player_tracks)
-    with open(local_video_path, "rb") as f:
-        files = {
-            "file": (local_video_path, f, "video/mp4"),
-            "player_tracks_file": ("player_tracks.json", tracks_json_str.encode("utf-8"), "application/json")
-        }
-        r = requests.post(url, files=files)
+    files = {
+        "player_tracks_file": ("player_tracks.npz", encode_tracks(player_tracks=player_tracks), TRACKS_MEDIA_TYPE)
+    }
+    data = {"video_uri": video_uri, "video_hash": video_hash, "game_id": game_id}
+    r = requests.post(url, data=data, files=files)
     r.raise_for_status()
     data = r.json()
     return data
 
-def get_tracks_from_service(local_video_path: str):
+def serialize_tracks(tracks):
+    return [[{"track_id": int(track_id), "bbox": info["bbox"]} for track_id, info in frame.items()] for frame in tracks]
+
+def open_team_session(video_uri: str, video_hash: str, game_id: str = None):
+    data = {"video_uri": video_uri, "video_hash": video_hash, "game_id": game_id}
+    r = requests.post(CONFIG.assigner_online_url, data=data)
+    r.raise_for_status()
+    return r.json()["session_id"]
+
+def assign_teams_chunk(session_id: str, start_frame: int, player_tracks):
+    # team labels for one chunk of frames, final as soon as they come back
+    chunk = {"start_frame": start_frame, "player_tracks": serialize_tracks(player_tracks)}
+    r = requests.post(f"{CONFIG.assigner_online_url}/{session_id}", json=chunk)
+    r.raise_for_status()
+    return r.json()
+
+def close_team_session(session_id: str):
+    r = requests.delete(f"{CONFIG.assigner_online_url}/{session_id}")
+    r.raise_for_status()
+    return r.json()
+
+def get_tracks_from_service(video_uri: str, video_hash: str):
     url = CONFIG.detector_url
-    with open(local_video_path, "rb") as f:
-        files = {"file": (local_video_path, f, "video/mp4")}
-        r = requests.post(url, files=files)
+    data = {"video_uri": video_uri, "video_hash": video_hash}
+    r = requests.post(url, data=data, headers={"Accept": f"{TRACKS_MEDIA_TYPE}, application/json"})
     r.raise_for_status()
+
+    if r.headers.get("content-type", "").startswith(TRACKS_MEDIA_TYPE):
+        tables = decode_tracks(r.content)
+        return arrays_to_tracks(*tables["player_tracks"]), arrays_to_tracks(*tables["ball_tracks"])
+
     data = r.json()
-    return data["player_tracks"], data["ball_tracks"]
+    return deserialize_tracks(data["player_tracks"]), deserialize_tracks(data["ball_tracks"])
+
+def stream_tracks_from_service(video_uri: str, video_hash: str, on_frames=None, on_tracks=None):
+    # NDJSON records from /track/stream, on_frames(frames_done, num_frames) and
+    # on_tracks(start_frame, player_tracks) are called per batch
+    data = {"video_uri": video_uri, "video_hash": video_hash}
+    player_tracks, ball_tracks, num_frames = [], None, 0
+
+    with requests.post(CONFIG.detector_stream_url, data=data, stream=True) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            if record["type"] == "start":
+                num_frames = record["num_frames"]
+            elif record["type"] == "player_tracks":
+                frames = deserialize_tracks(record["frames"])
+                player_tracks += frames
+                if on_tracks is not None:
+                    on_tracks(record["start_frame"], frames)
+                if on_frames is not None:
+                    on_frames(len(player_tracks), num_frames)
+            elif record["type"] == "ball_tracks":
+                ball_tracks = deserialize_tracks(record["frames"])
+            elif record["type"] == "error":
+                raise RuntimeError(f"Detector failed: {record['detail']}")
+            elif record["type"] == "end":
+                break
+
+    if ball_tracks is None or len(player_tracks) != num_frames:
+        raise RuntimeError("Detector stream ended before all tracks were received")
+    return player_tracks, ball_tracks
 
 def deserialize_tracks(serialized):
     tracks = []
@@ -48,24 +104,19 @@ def deserialize_tracks(serialized):
         tracks.append(frame_dict)
     return tracks
 
-def get_homographies_from_service(local_video_path: str, local_reference_path: str):
-    # Ensure the files exist before trying to open them
-    if not os.path.exists(local_video_path):
-        raise FileNotFoundError(f"Video file not found: {local_video_path}")
+def get_homographies_from_service(video_uri: str, video_hash: str, local_reference_path: str):
+    # Ensure the reference exists before trying to open it
     if not os.path.exists(local_reference_path):
         raise FileNotFoundError(f"Reference image not found: {local_reference_path}")
-    
-    # Open both files with their own handles
-    with open(local_video_path, "rb") as video_file, \
-         open(local_reference_path, "rb") as reference_file:
-        
-        # Use the correct file handles for each part
+
+    # Only the small reference image is uploaded, the service pulls the video itself
+    with open(local_reference_path, "rb") as reference_file:
         files = {
-            "video": ("video.mp4", video_file, "video/mp4"),
             "reference": ("reference.jpg", reference_file, "image/jpeg")
         }
-        
-        r = requests.post(CONFIG.homography_url, files=files)
+        data = {"video_uri": video_uri, "video_hash": video_hash}
+
+        r = requests.post(CONFIG.homography_url, data=data, files=files)
     
     r.raise_for_status()
     data = r.json()
@@ -1,3 +1,4 @@
 from .track_players_drawer import PlayerTrackDrawer
 from .ball_tracks_drawer import BallTrackDrawer
-from .top_down_overlay import TDOverlay
\ No newline at end of file
+from .top_down_overlay import TDOverlay
+from .frame_annotator import FrameAnnotator
\ No newline at end of file
@@ -0,0 +1,56 @@
+import os
+import numpy as np
+from .utils import draw_triangle, draw_square, run_sharded
+
+class FrameAnnotator: # bgr
+    # draws players, possession and ball in one in-place pass, OpenCV releases the GIL so frame ranges run on threads
+    def __init__(self, team_1_color=[83, 168, 52], team_2_color=[244, 133, 66], num_workers=None):
+        self.default_player_team_id = 1
+        self.team_1_color = team_1_color
+        self.team_2_color = team_2_color
+        self.possession_color = (0, 0, 255)
+        self.ball_pntr_color = (0, 255, 0)
+        self.num_workers = num_workers or os.cpu_count() or 1
+
+    def draw_frame(self, frame, player_dict, player_assignment_for_frame, id_player_with_ball, ball_dict):
+        for track_id, player in player_dict.items():
+            team_id = player_assignment_for_frame.get(track_id, self.default_player_team_id)
+            color = self.team_1_color if team_id == 1 else self.team_2_color
+
+            if track_id == id_player_with_ball:
+                draw_triangle(frame, player["bbox"], self.possession_color)
+
+            draw_square(frame, player["bbox"], color, track_id)
+
+        for _, track in ball_dict.items():
+            bbox = track["bbox"]
+            if bbox is None or len(bbox) == 0:
+                continue
+            draw_triangle(frame, bbox, self.ball_pntr_color)
+
+        return frame
+
+    def _draw_range(self, out_frames, start, end, start_frame, player_tracks, player_assignment,
+                    ball_acquisition_list, ball_tracks):
+        for i in range(start, end):
+            frame_id = start_frame + i
+            self.draw_frame(
+                out_frames[i],
+                player_tracks[frame_id],
+                player_assignment[frame_id],
+                ball_acquisition_list[frame_id],
+                ball_tracks[frame_id],
+            )
+
+    def draw_annotations(self, video_frames, player_tracks, player_assignment, ball_acquisition_list,
+                         ball_tracks, start_frame=0):
+        # single copy of the window, every drawing call after that writes into it
+        out_frames = np.array(video_frames, dtype=np.uint8, copy=True)
+        args = (start_frame, player_tracks, player_assignment, ball_acquisition_list, ball_tracks)
+
+        run_sharded(
+            lambda start, end: self._draw_range(out_frames, start, end, *args),
+            len(out_frames),
+            self.num_workers,
+        )
+        return out_frames
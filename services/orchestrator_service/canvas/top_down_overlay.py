@@ -1,5 +1,6 @@
 import cv2
 import numpy as np
+from .utils import run_sharded
 
 class TDOverlay:
     def __init__(self, ref, minimap, t1_color = [83, 168, 52], t2_color = [244, 133, 66], xz=300, yz=170):
@@ -49,9 +50,13 @@ class TDOverlay:
 
         return topdown
 
-    def draw_voronoi(self, minimap, subdiv, teams, alpha=0.2):
+    def draw_voronoi(self, minimap, subdiv, teams, alpha=0.2, vor_buf=None, dst=None, compute_control=True):
         facets, _ = subdiv.getVoronoiFacetList([])
-        vor_minimap = minimap.copy()
+        if vor_buf is None:
+            vor_minimap = minimap.copy()
+        else:
+            np.copyto(vor_buf, minimap)
+            vor_minimap = vor_buf
         frame_control = {1: 0, 2: 0}
 
         boundary_poly = np.array([
@@ -64,13 +69,14 @@ class TDOverlay:
         for facet, t in zip(facets, teams):
             facet = np.array(facet, dtype=np.int32)
 
-            intersection_area, _ = cv2.intersectConvexConvex(facet, boundary_poly)
-            frame_control[t] += intersection_area / self.video_area
+            if compute_control:
+                intersection_area, _ = cv2.intersectConvexConvex(facet, boundary_poly)
+                frame_control[t] += intersection_area / self.video_area
 
             cv2.fillConvexPoly(vor_minimap, facet, self.color[t], lineType=cv2.LINE_AA)
             cv2.polylines(vor_minimap, [facet], True, (0, 0, 0), 2, lineType=cv2.LINE_AA)
 
-        result = cv2.addWeighted(vor_minimap, alpha, minimap, 1-alpha, 0)
+        result = cv2.addWeighted(vor_minimap, alpha, minimap, 1-alpha, 0, dst=dst)
         return result, frame_control
     
     def draw_players(self, minimap, positions, teams):
@@ -79,35 +85,57 @@ class TDOverlay:
             cv2.circle(minimap, (mx, my), 10, (0, 0, 0), 2, lineType=cv2.LINE_AA)
         return minimap
     
-    def draw_overlay(self, frames, td_track, x=0, y=0):
+    def draw_minimap_frame(self, td_frame, out, vor_buf=None, compute_control=True):
+        # renders one minimap into out, the cached court background is never modified
+        subdiv = cv2.Subdiv2D((0, 0, self.minimap_w, self.minimap_h))
+        team = []
+        positions = []
+
+        for _, player in td_frame.items():
+            px, py = player["pos"]
+            mx, my = int(px*self.minimap_w), int(py*self.minimap_h)
+
+            mx = max(0, min(mx, self.minimap_w - 1))
+            my = max(0, min(my, self.minimap_h - 1))
+
+            team_id = player["team_id"]
+
+            subdiv.insert((mx, my))
+            positions.append((mx, my))
+            team.append(team_id)
+
+        _, frame_control = self.draw_voronoi(self.minimap, subdiv, team, vor_buf=vor_buf, dst=out,
+                                             compute_control=compute_control)
+        self.draw_players(out, positions, team)
+        return frame_control
+
+    def draw_minimaps(self, td_track, start_frame=0, num_frames=None, num_workers=1, compute_control=True):
+        # renders a batch of minimap frames into one preallocated array, shards run on threads
+        # pass compute_control=False when the stats come from CourtControlEngine
+        if num_frames is None:
+            num_frames = len(td_track) - start_frame
+        out = np.empty((num_frames, self.minimap_h, self.minimap_w, 3), dtype=np.uint8)
+        control = [None] * num_frames
+
+        def render_range(start, end):
+            vor_buf = np.empty_like(self.minimap)
+            for i in range(start, end):
+                control[i] = self.draw_minimap_frame(td_track[start_frame + i], out[i], vor_buf, compute_control)
+
+        run_sharded(render_range, num_frames, num_workers)
+        return out, control
+
+    def draw_overlay(self, frames, td_track, x=0, y=0, start_frame=0):
         res = []
         control = []
-        for frame_idx, td_frame in enumerate(td_track):
-            frame = frames[frame_idx].copy()
-            minimap_frame = self.minimap.copy()
+        vor_buf = np.empty_like(self.minimap)
+        minimap_frame = np.empty_like(self.minimap)
+        for frame_idx, frame in enumerate(frames, start=start_frame):
+            frame = frame.copy()
+            frame_control = self.draw_minimap_frame(td_track[frame_idx], minimap_frame, vor_buf)
 
-            subdiv = cv2.Subdiv2D((0, 0, self.minimap_w, self.minimap_h))
-            team = []
-            positions = []
-
-            for _, player in td_frame.items():
-                px, py = player["pos"]
-                mx, my = int(px*self.minimap_w), int(py*self.minimap_h)
-
-                mx = max(0, min(mx, self.minimap_w - 1))
-                my = max(0, min(my, self.minimap_h - 1))
-
-                team_id = player["team_id"]
-
-                subdiv.insert((mx, my))
-                positions.append((mx, my))
-                team.append(team_id)
-            
-            minimap_frame, frame_control = self.draw_voronoi(minimap_frame, subdiv, team)
-            minimap_frame = self.draw_players(minimap_frame, positions, team)
-            
             frame[x:self.minimap_h, y:self.minimap_w] = minimap_frame
             control.append(frame_control)
             res.append(frame)
 
-        return res, control
\ No newline at end of file
+        return res, control
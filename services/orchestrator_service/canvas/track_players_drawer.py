@@ -6,9 +6,9 @@ class PlayerTrackDrawer: # bgr
         self.team_1_color=team_1_color
         self.team_2_color=team_2_color
 
-    def draw_annotations(self,video_frames,tracks,player_assignment,ball_acquisition_list):
+    def draw_annotations(self,video_frames,tracks,player_assignment,ball_acquisition_list,start_frame=0):
         output_video_frames= []
-        for frame_id, frame in enumerate(video_frames):
+        for frame_id, frame in enumerate(video_frames, start=start_frame):
             frame = frame.copy()
 
             player_dict = tracks[frame_id]
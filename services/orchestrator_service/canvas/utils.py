@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 import sys
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append("../")
 from shared.utils import get_width_bbox, get_center_bbox
 
@@ -58,4 +59,20 @@ def draw_triangle(frame, bbox, color):
     ])
     cv2.drawContours(frame, [triangle_points], 0, color, cv2.FILLED)
     cv2.drawContours(frame, [triangle_points], 0, (0,0,0), 2)
-    return frame
\ No newline at end of file
+    return frame
+
+def run_sharded(fn, num_items, num_workers=1):
+    # calls fn(start, end) on contiguous ranges, one per worker thread
+    if num_items == 0:
+        return
+    num_shards = max(1, min(num_workers, num_items))
+    bounds = np.linspace(0, num_items, num_shards + 1, dtype=int)
+
+    if num_shards == 1:
+        fn(0, num_items)
+        return
+
+    with ThreadPoolExecutor(max_workers=num_shards) as pool:
+        futures = [pool.submit(fn, int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:])]
+        for future in futures:
+            future.result()
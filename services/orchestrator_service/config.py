@@ -4,14 +4,33 @@ from dataclasses import dataclass
 @dataclass(frozen=True)
 class ServiceConfig:
     detector_url: str
+    detector_stream_url: str
+    stream_tracks: bool
     assigner_url: str
+    assigner_online_url: str
+    online_teams: bool
     homography_url: str
+    frame_chunk_size: int
+    max_concurrent_jobs: int
+    job_retention_s: float
+    max_finished_jobs: int
+    render_workers: int
 
 def load_config():
     return ServiceConfig(
         detector_url=os.getenv("DETECTOR_URL", "http://detector_service:8000/track"),
+        detector_stream_url=os.getenv("DETECTOR_STREAM_URL", "http://detector_service:8000/track/stream"),
+        # the stream is NDJSON and only feeds job progress, /track returns the npz columns
+        stream_tracks=os.getenv("STREAM_TRACKS", "0") == "1",
         assigner_url=os.getenv("TEAM_ASSIGNER_URL", "http://team_assigner_service:8000/assign_teams"),
+        assigner_online_url=os.getenv("TEAM_ASSIGNER_ONLINE_URL", "http://team_assigner_service:8000/assign_teams/online"),
+        online_teams=os.getenv("ONLINE_TEAMS", "0") == "1",
         homography_url=os.getenv("HOMOGRAPHY_URL", "http://court-service:8000/homographyvideo"),
+        frame_chunk_size=int(os.getenv("FRAME_CHUNK_SIZE", "64")),
+        max_concurrent_jobs=int(os.getenv("MAX_CONCURRENT_JOBS", "2")),
+        job_retention_s=float(os.getenv("JOB_RETENTION_S", "3600")),
+        max_finished_jobs=int(os.getenv("MAX_FINISHED_JOBS", "100")),
+        render_workers=int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1))),
     )
 
 CONFIG = load_config()
@@ -0,0 +1 @@
+from .court_control_engine import CourtControlEngine
\ No newline at end of file
@@ -0,0 +1,61 @@
+import numpy as np
+
+class CourtControlEngine():
+    def __init__(self, minimap_w=1280, minimap_h=720, grid_w=64, grid_h=36, batch_size=256):
+        # positions are measured in minimap pixels, like the voronoi drawn on the minimap
+        self.minimap_w = minimap_w
+        self.minimap_h = minimap_h
+        self.batch_size = batch_size
+
+        # court sampled at the centers of a grid_w x grid_h grid, every sample owns the same area
+        xs = (np.arange(grid_w, dtype=np.float32) + 0.5) * (minimap_w / grid_w)
+        ys = (np.arange(grid_h, dtype=np.float32) + 0.5) * (minimap_h / grid_h)
+        gx, gy = np.meshgrid(xs, ys)
+        self.grid_x = gx.ravel()[None, :] # (1, M)
+        self.grid_y = gy.ravel()[None, :]
+
+    def get_frame_arrays(self, td_tracks):
+        # td_tracks -> padded (F, P, 2) minimap positions and (F, P) team ids, 0 marks padding
+        num_frames = len(td_tracks)
+        max_players = max((len(frame) for frame in td_tracks), default=0)
+        positions = np.full((num_frames, max(max_players, 1), 2), np.inf, dtype=np.float32)
+        teams = np.zeros((num_frames, max(max_players, 1)), dtype=np.int8)
+
+        for frame_idx, frame in enumerate(td_tracks):
+            for slot, player in enumerate(frame.values()):
+                px, py = player["pos"]
+                positions[frame_idx, slot, 0] = max(0, min(int(px * self.minimap_w), self.minimap_w - 1))
+                positions[frame_idx, slot, 1] = max(0, min(int(py * self.minimap_h), self.minimap_h - 1))
+                team_id = player["team_id"]
+                teams[frame_idx, slot] = team_id if team_id in (1, 2) else -1
+
+        return positions, teams
+
+    def get_control_stats(self, td_tracks):
+        """Per frame {1: fraction, 2: fraction} of the court closest to each team, same format as TDOverlay."""
+        positions, teams = self.get_frame_arrays(td_tracks)
+        num_frames = len(td_tracks)
+        control = np.zeros((num_frames, 2), dtype=np.float64)
+
+        for start in range(0, num_frames, self.batch_size):
+            end = min(start + self.batch_size, num_frames)
+            pos = positions[start:end] # (B, P, 2)
+            frame_teams = teams[start:end]
+
+            # running nearest player per grid sample, one player slot at a time keeps temporaries at (B, M)
+            best = np.full((end - start, self.grid_x.shape[1]), np.inf, dtype=np.float32)
+            labels = np.zeros(best.shape, dtype=np.int8)
+            for slot in range(pos.shape[1]):
+                dist = (self.grid_x - pos[:, slot, 0, None]) ** 2 + (self.grid_y - pos[:, slot, 1, None]) ** 2
+                closer = dist < best
+                np.copyto(best, dist, where=closer)
+                np.copyto(labels, frame_teams[:, slot, None], where=closer)
+
+            control[start:end, 0] = (labels == 1).mean(axis=1)
+            control[start:end, 1] = (labels == 2).mean(axis=1)
+
+        # frames without players control nothing
+        empty = np.array([len(frame) == 0 for frame in td_tracks], dtype=bool)
+        control[empty] = 0
+
+        return [{1: float(c1), 2: float(c2)} for c1, c2 in control]
@@ -0,0 +1,117 @@
+import time
+import asyncio
+import hashlib
+
+def make_job_id(video_name, reference_court, video_etag="", game_id=None):
+    # same video/court pair (and same uploaded bytes) always maps to the same job
+    key = f"{video_name}:{reference_court}:{video_etag}"
+    if game_id:
+        key += f":{game_id}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+class JobManager:
+    def __init__(self, run_job, num_workers=2, retention_s=3600, max_finished_jobs=100):
+        self.run_job = run_job # async callable(job, progress) -> result dict
+        self.num_workers = num_workers
+        # finished jobs and their results are dropped after retention_s, or beyond max_finished_jobs
+        self.retention_s = retention_s
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = {}
+        self.done_events = {}
+        self.queue = asyncio.Queue()
+        self.pending = [] # queued job ids in queue order
+        self.workers = []
+
+    def start(self):
+        for _ in range(self.num_workers):
+            self.workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(self, job_id, video_name, reference_court, game_id=None):
+        self._prune()
+        job = self.jobs.get(job_id)
+        if job is not None and job["status"] != "failed":
+            return job
+
+        job = {
+            "job_id": job_id,
+            "video_name": video_name,
+            "reference_court": reference_court,
+            "game_id": game_id,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0.0,
+            "error": None,
+            "result": None,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self.jobs[job_id] = job
+        self.done_events[job_id] = asyncio.Event()
+        self.queue.put_nowait(job_id)
+        self.pending.append(job_id)
+        return job
+
+    def _prune(self):
+        finished = sorted(
+            (job["finished_at"], job_id) for job_id, job in self.jobs.items() if job["finished_at"] is not None
+        )
+        expired = len(finished) - self.max_finished_jobs
+        now = time.time()
+        for i, (finished_at, job_id) in enumerate(finished):
+            if i >= expired and now - finished_at <= self.retention_s:
+                break
+            del self.jobs[job_id]
+            del self.done_events[job_id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def status(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        status = {k: v for k, v in job.items() if k != "result"}
+        if job["status"] == "queued":
+            status["queue_position"] = self.pending.index(job_id) + 1
+        return status
+
+    async def wait(self, job_id):
+        # the job may be pruned once it is done, the caller still gets it
+        job = self.jobs[job_id]
+        await self.done_events[job_id].wait()
+        return job
+
+    def _progress_callback(self, job):
+        def progress(stage, fraction):
+            job["stage"] = stage
+            job["progress"] = round(float(fraction), 4)
+        return progress
+
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            self.pending.remove(job_id)
+            job = self.jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            try:
+                job["result"] = await self.run_job(job, self._progress_callback(job))
+                job["status"] = "completed"
+                job["stage"] = "completed"
+                job["progress"] = 1.0
+            except Exception as e:
+                print(f"[Jobs] Job {job_id} failed: {e!r}")
+                job["status"] = "failed"
+                job["error"] = repr(e)
+            finally:
+                job["finished_at"] = time.time()
+                self.done_events[job_id].set()
+                self.queue.task_done()
+                self._prune()
@@ -1,53 +1,206 @@
 import os
 import json
+import asyncio
 import uvicorn
-import numpy as np
-from fastapi import FastAPI
+import requests
+from contextlib import asynccontextmanager
+from botocore.exceptions import BotoCoreError, ClientError
+from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from prometheus_fastapi_instrumentator import Instrumentator
 
 from orchestrator_service.api_utils import (
     get_tracks_from_service,
+    stream_tracks_from_service,
     get_team_assignments_from_service,
-    deserialize_tracks,
+    open_team_session,
+    assign_teams_chunk,
+    close_team_session,
     deserialize_team_assignments,
     get_homographies_from_service,
     id_to_team_ball_acquisition,
 )
+from orchestrator_service.config import CONFIG
+from orchestrator_service.jobs import JobManager, make_job_id
 
 from orchestrator_service.mongo_writer import (
     save_ball_possession,
     save_control_stats,
 )
 
-from shared import download_to_temp, upload_video
-from shared.utils import read_video, save_video
-from orchestrator_service.canvas import PlayerTrackDrawer, BallTrackDrawer, TDOverlay
+from shared import download_to_temp, download_cached, upload_video, get_object_etag
+from shared.frame_store import get_video_meta, load_video_frames
+from shared.utils import open_video_writer, abort_video_writer
+from orchestrator_service.canvas import FrameAnnotator, TDOverlay
 from orchestrator_service.ball_acq import BallAcquisitionSensor
+from orchestrator_service.court_control import CourtControlEngine
 
-app = FastAPI()
+RAW_BUCKET = "basketball-raw-videos"
+REF_BUCKET = "basketball-panorama-warp"
+
+@asynccontextmanager
+async def lifespan(app):
+    job_manager.start()
+    yield
+    await job_manager.stop()
+
+app = FastAPI(lifespan=lifespan)
 Instrumentator().instrument(app).expose(app)
 
-@app.post("/process")
-async def process_video(video_name: str, reference_court: str):
-    bucket = "basketball-raw-videos"
-    ref_bucket = "basketball-panorama-warp"
+async def get_service_results(video_uri, video_hash, tmp_ref_path, on_frames=None, game_id=None):
+    # detector and court service run concurrently, the team assigner only waits for the tracks
+    # services get the video by reference and map it from the frame store or pull it from MinIO
+    # with online team assignment every streamed batch of tracks is labeled right away
+    online_teams = CONFIG.stream_tracks and CONFIG.online_teams
+    team_session = await asyncio.to_thread(open_team_session, video_uri, video_hash, game_id) if online_teams else None
+    loop = asyncio.get_running_loop()
+    team_queue = asyncio.Queue()
+
+    def on_tracks(start_frame, player_tracks):
+        # runs on the thread reading the detector stream, the chunk is posted by post_team_chunks
+        loop.call_soon_threadsafe(team_queue.put_nowait, (start_frame, player_tracks))
+
+    async def post_team_chunks():
+        # labels per chunk until the None sentinel, None when the team assigner failed
+        team_chunks = []
+        while (chunk := await team_queue.get()) is not None:
+            if team_chunks is None:
+                continue
+            try:
+                team_chunks.append(await asyncio.to_thread(assign_teams_chunk, team_session, *chunk))
+            except requests.RequestException as e:
+                print(f"[Online] Team assignment of chunk {chunk[0]} failed ({e!r}), assigning after tracking")
+                team_chunks = None
+        return team_chunks
+
+    async def tracking():
+        if CONFIG.stream_tracks:
+            # tracks arrive batch by batch while detection is still running
+            return await asyncio.to_thread(stream_tracks_from_service, video_uri, video_hash, on_frames,
+                                           on_tracks if team_session else None)
+        return await asyncio.to_thread(get_tracks_from_service, video_uri, video_hash)
+
+    async def team_assignment(tracking_task):
+        if team_session:
+            poster = asyncio.create_task(post_team_chunks())
+            try:
+                player_tracks, _ = await tracking_task
+            finally:
+                team_queue.put_nowait(None)
+                team_chunks = await poster
+                try:
+                    session = await asyncio.to_thread(close_team_session, team_session)
+                except requests.RequestException as e:
+                    print(f"[Online] Closing team session {team_session} failed ({e!r})")
+                    team_chunks = None
+            if team_chunks is not None:
+                team_assignments = [frame for chunk in team_chunks for frame in chunk["team_assignments"]]
+                return {"team_assignments": team_assignments, "team_colors": session["team_colors"]}
+        else:
+            player_tracks, _ = await tracking_task
+        return await asyncio.to_thread(get_team_assignments_from_service, video_uri, video_hash, player_tracks, game_id)
+
+    tracking_task = asyncio.create_task(tracking())
+    team_task = asyncio.create_task(team_assignment(tracking_task))
+    homography_task = asyncio.create_task(
+        asyncio.to_thread(get_homographies_from_service, video_uri, video_hash, tmp_ref_path)
+    )
+
+    (player_tracks, ball_tracks), team_assignments_json, H = await asyncio.gather(
+        tracking_task, team_task, homography_task
+    )
+    return player_tracks, ball_tracks, team_assignments_json, H
+
+def render_videos(video_name, vid_frames_all, tmp_ref_path, base_court, player_tracks, ball_tracks,
+                  team_assignments, team_colors, ball_acquisition_list, H, fps=24.0, output_dir="output_videos", progress=None):
+    annotator = FrameAnnotator(team_1_color=team_colors["1"], team_2_color=team_colors["2"],
+                               num_workers=CONFIG.render_workers)
+
+    top_down_overlay = TDOverlay(tmp_ref_path, base_court, t1_color=team_colors["1"], t2_color=team_colors["2"], xz=1280, yz=720)
+    td_tracks = top_down_overlay.get_td_tracks(player_tracks, team_assignments, H)
+
+    # court control is computed in bulk, independent of drawing the minimap
+    control_engine = CourtControlEngine(minimap_w=top_down_overlay.minimap_w, minimap_h=top_down_overlay.minimap_h)
+    control_stats = control_engine.get_control_stats(td_tracks)
+
+    out_path = os.path.join(output_dir, f"{video_name}.mp4")
+    minimap_out_path = os.path.join(output_dir, f"{video_name}_minimap.mp4")
+    # (writer, path) of the open encoders, if rendering or encoding fails all are stopped and their files removed
+    writers = []
+    try:
+        # only one window of frames is paged in at a time
+        for start_frame in range(0, len(vid_frames_all), CONFIG.frame_chunk_size):
+            vid_frames = vid_frames_all[start_frame:start_frame + CONFIG.frame_chunk_size]
+            output_vid_frames = annotator.draw_annotations(
+                vid_frames,
+                player_tracks,
+                team_assignments,
+                ball_acquisition_list,
+                ball_tracks,
+                start_frame=start_frame,
+            )
+
+            output_vid_minimap, _ = top_down_overlay.draw_minimaps(
+                td_tracks,
+                start_frame=start_frame,
+                num_frames=len(output_vid_frames),
+                num_workers=CONFIG.render_workers,
+                compute_control=False,
+            )
+
+            if not writers:
+                frame_height, frame_width = output_vid_frames[0].shape[:2]
+                writers.append((open_video_writer(out_path, frame_width, frame_height, fps), out_path))
+                minimap_height, minimap_width = output_vid_minimap[0].shape[:2]
+                writers.append((open_video_writer(minimap_out_path, minimap_width, minimap_height, fps), minimap_out_path))
+            out_writer, minimap_writer = writers[0][0], writers[1][0]
+
+            for frame in output_vid_frames:
+                out_writer.write(frame)
+            for frame in output_vid_minimap:
+                minimap_writer.write(frame)
+
+            if progress is not None:
+                progress("rendering", (start_frame + len(vid_frames)) / len(vid_frames_all))
+
+        for writer, _ in writers:
+            writer.release()
+    except BaseException:
+        for writer, path in writers:
+            abort_video_writer(writer, path)
+        raise
+
+    return out_path, minimap_out_path, control_stats
+
+async def run_pipeline(video_name, reference_court, output_dir="output_videos", progress=None, game_id=None):
     key = f"{video_name}.mp4"
     base_path = os.path.dirname(__file__)
     base_court = os.path.join(base_path, "imgs", "court.jpg")
 
+    def report(stage, fraction):
+        if progress is not None:
+            progress(stage, fraction)
+
     # 1) Download raw video
-    tmp_video_path = download_to_temp(key=key, bucket=bucket)
-    tmp_ref_path = download_to_temp(key=reference_court, bucket=ref_bucket)
-    vid_frames = read_video(tmp_video_path)
+    report("downloading", 0.0)
+    video_uri = f"s3://{RAW_BUCKET}/{key}"
+    tmp_video_path = await asyncio.to_thread(download_cached, video_uri)
+    tmp_ref_path = await asyncio.to_thread(download_to_temp, key=reference_court, bucket=REF_BUCKET)
+
+    # 1.1) Decode once into the shared frame store, the other services map the same frames
+    video_hash, vid_frames_all = await asyncio.to_thread(load_video_frames, tmp_video_path)
+    fps = get_video_meta(video_hash)["fps"]
+
+    # 2-3) Get tracks, team assignments and homographies
+    # streamed tracking covers 5-35 % of the reported progress
+    def tracking_progress(frames_done, num_frames):
+        report("tracking", 0.05 + 0.3 * frames_done / max(num_frames, 1))
 
-    # 2) Get tracks
-    player_tracks_json, ball_tracks_json = get_tracks_from_service(tmp_video_path)
-    player_tracks  = deserialize_tracks(player_tracks_json)
-    ball_tracks    = deserialize_tracks(ball_tracks_json)
+    report("services", 0.05)
+    player_tracks, ball_tracks, team_assignments_json, H = await get_service_results(
+        video_uri, video_hash, tmp_ref_path, on_frames=tracking_progress, game_id=game_id
+    )
 
-    # 3) Get team assignments
-    team_assignments_json = get_team_assignments_from_service(tmp_video_path, player_tracks)
     team_assignments = deserialize_team_assignments(team_assignments_json["team_assignments"])
     team_colors = team_assignments_json["team_colors"]
     print("team colors:: ", team_colors)
@@ -62,63 +215,101 @@ async def process_video(video_name: str, reference_court: str):
     ball_team_possessions = id_to_team_ball_acquisition(ball_acquisition_list,
                                                         team_assignments)   
 
-    H = get_homographies_from_service(tmp_video_path, tmp_ref_path)
-
-    # 5) Draw overlays
-    player_draw = PlayerTrackDrawer(team_1_color=team_colors["1"], team_2_color=team_colors["2"])
-    ball_draw   = BallTrackDrawer()
+    # 5-6) Draw overlays and encode both outputs in one pass each, off the event loop
+    # the overlay and minimap ffmpeg encoders run side by side as separate processes
+    # rendering and encoding cover 40-95 % of the reported progress
+    def render_progress(stage, fraction):
+        report(stage, 0.4 + 0.55 * fraction)
 
-    player_vid_frames = player_draw.draw_annotations(
-        vid_frames,
+    report("rendering", 0.4)
+    out_path, minimap_out_path, control_stats = await asyncio.to_thread(
+        render_videos,
+        video_name,
+        vid_frames_all,
+        tmp_ref_path,
+        base_court,
         player_tracks,
+        ball_tracks,
         team_assignments,
+        team_colors,
         ball_acquisition_list,
-    )
-    output_vid_frames = ball_draw.draw_annotations(player_vid_frames, ball_tracks)
-
-    top_down_overlay = TDOverlay(tmp_ref_path, base_court, t1_color=team_colors["1"], t2_color=team_colors["2"], xz=1280, yz=720)
-    td_tracks = top_down_overlay.get_td_tracks(player_tracks, team_assignments, H)
-    minimap_frames = [np.zeros((720, 1280, 3), dtype=np.uint8) for _ in output_vid_frames]
-
-    output_vid_minimap, control_stats = top_down_overlay.draw_overlay(
-        minimap_frames,
-        td_tracks
-    )
-
-    # 6) Save & upload
-    out_path = f"output_videos/{video_name}.mp4"
-    save_video(output_vid_frames, out_path)
-
-    minimap_out_path = f"output_videos/{video_name}_minimap.mp4"
-    save_video(output_vid_minimap, minimap_out_path)
-
-    # 7) HTML req. proper .mp4 packaging, fix with ffmpeg
-    fixed_path = f"output_videos/{video_name}_fixed.mp4"
-    os.system(
-        f"ffmpeg -y -i {out_path} -vcodec libx264 -preset fast -movflags +faststart {fixed_path}"
-    )
-
-    minimap_fixed_path = f"output_videos/{video_name}_minimap_fixed.mp4"
-    os.system(
-        f"ffmpeg -y -i {minimap_out_path} -vcodec libx264 -preset fast -movflags +faststart {minimap_fixed_path}"
+        H,
+        fps,
+        output_dir,
+        render_progress,
     )
 
-    # 8) upload vid to bucket
-    upload_video(local_path=fixed_path, key=key, BUCKET_NAME="basketball-processed")
-    upload_video(local_path=minimap_fixed_path, key=key, BUCKET_NAME="basketball-minimap")
+    # 7) upload vid to bucket
+    report("uploading", 0.95)
+    await asyncio.to_thread(upload_video, local_path=out_path, key=key, BUCKET_NAME="basketball-processed")
+    await asyncio.to_thread(upload_video, local_path=minimap_out_path, key=key, BUCKET_NAME="basketball-minimap")
 
-    # 9) upload ball possession statistics to mongodb
-    save_ball_possession(video_name, ball_team_possessions)
-    save_control_stats(video_name, control_stats)
+    # 8) upload ball possession statistics to mongodb
+    save_ball_possession(video_name, ball_team_possessions, fps=fps)
+    save_control_stats(video_name, control_stats, fps=fps)
 
-    return JSONResponse({
+    return {
         "status": "completed",
         "ball_tp": f"{ball_team_possessions}",
         "vid_name": f"{video_name}",
         "control_stats": json.dumps(control_stats),
         "pi_stats": json.dumps(passes_and_interceptions),
         "team_colors": json.dumps(team_colors)
-    })
+    }
+
+async def run_job(job, progress):
+    output_dir = os.path.join("output_videos", job["job_id"])
+    return await run_pipeline(job["video_name"], job["reference_court"], output_dir=output_dir, progress=progress,
+                              game_id=job["game_id"])
+
+job_manager = JobManager(run_job, num_workers=CONFIG.max_concurrent_jobs,
+                         retention_s=CONFIG.job_retention_s, max_finished_jobs=CONFIG.max_finished_jobs)
+
+async def submit_job(video_name, reference_court, game_id=None):
+    try:
+        etag = await asyncio.to_thread(get_object_etag, f"{video_name}.mp4", RAW_BUCKET)
+    except ClientError as e:
+        # only a missing object is the caller's mistake, other storage errors are ours
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "NoSuchBucket", "NotFound", "404"):
+            raise HTTPException(status_code=404, detail=f"Video {video_name}.mp4 not found in {RAW_BUCKET}")
+        raise HTTPException(status_code=503, detail=f"Video {video_name}.mp4 could not be looked up: {e}")
+    except BotoCoreError as e:
+        raise HTTPException(status_code=503, detail=f"Video {video_name}.mp4 could not be looked up: {e}")
+    job_id = make_job_id(video_name, reference_court, etag, game_id)
+    return job_manager.submit(job_id, video_name, reference_court, game_id)
+
+@app.post("/jobs", status_code=202)
+async def create_job(video_name: str, reference_court: str, game_id: str = None):
+    # clips with the same game_id reuse the team colors and numbering of earlier clips
+    job = await submit_job(video_name, reference_court, game_id)
+    return job_manager.status(job["job_id"])
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    status = job_manager.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return JSONResponse(job["result"])
+
+@app.post("/process")
+async def process_video(video_name: str, reference_court: str, game_id: str = None):
+    # blocking variant of /jobs, kept for existing clients, still runs on the worker pool
+    job = await submit_job(video_name, reference_court, game_id)
+    job = await job_manager.wait(job["job_id"])
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    return JSONResponse(job["result"])
 
 @app.get("/ping")
 def ping():
@@ -1 +1,6 @@
-from .team_assigner import TeamAssigner
\ No newline at end of file
+from .team_assigner import TeamAssigner
+from .sampling import sample_track_frames
+from .features import color_histograms
+from .online import OnlineTeamAssigner
+from .prototypes import TeamPrototypeStore
+from .parallel import ParallelFeatureExtractor
@@ -0,0 +1,114 @@
+import numpy as np
+from collections import Counter
+from sklearn.cluster import KMeans
+
+from .team_assigner import TeamAssigner
+from .prototypes import fit_distance
+
+class OnlineTeamAssigner(TeamAssigner):
+    """
+    Team assignment over chunks of player tracks as they arrive, e.g. per detector batch.
+    Keeps a running feature sum per track id and two team centroids, so memory grows with the
+    number of tracks and not with the number of frames. The centroids are seeded with KMeans once two
+    tracks have been seen min_track_frames times and then follow an online (MacQueen) k-means update.
+    A track only changes team when the other centroid is closer by more than switch_margin,
+    so labels stay stable from chunk to chunk. Prototypes of earlier clips of the same game seed the
+    centroids, weighted like prototype_weight tracks, and keep their team numbering.
+    """
+    def __init__(self, crop_factor = 0.3, samples_per_chunk = 2, min_track_frames = 4, switch_margin = 0.1,
+                 prototypes = None, prototype_weight = 10):
+        super().__init__(crop_factor=crop_factor, samples_per_track=samples_per_chunk, min_track_frames=min_track_frames)
+        self.switch_margin = switch_margin
+        self.feature_sums = {}
+        self.feature_counts = Counter()
+        self.seen = Counter()
+        self.centroids = None # (2, 128)
+        self.centroid_counts = np.zeros(2)
+        self.teams = {} # pid -> 0 / 1
+        if prototypes is not None:
+            self.centroids = np.array(prototypes["centroids"], dtype=np.float64)
+            self.centroid_counts = np.full(2, float(prototype_weight))
+
+    def update(self, vid_frames, player_tracks, start_frame=0):
+        """
+        Adds a chunk of per-frame player tracks starting at start_frame of vid_frames and
+        returns its per-frame {pid: team_id} assignments. Frames before the centroids exist stay empty.
+        """
+        samples = self.sample_frames(player_tracks)
+        sampled = [(start_frame + frame_id, pid) for frame_id in sorted(samples) for pid in samples[frame_id]]
+        sampled = [(frame_id - start_frame, pid) for frame_id, pid in self.readable_samples(vid_frames, sampled)]
+        if sampled:
+            frame_ids = [start_frame + frame_id for frame_id, _ in sampled]
+            boxes = [player_tracks[frame_id][pid]['bbox'] for frame_id, pid in sampled]
+            feats = self.extract_features(vid_frames, frame_ids, boxes)
+            for (_, pid), feat in zip(sampled, feats):
+                if feat.any(): # empty crop
+                    self.feature_sums[pid] = self.feature_sums.get(pid, 0) + feat
+                    self.feature_counts[pid] += 1
+
+        self.seen.update(pid for player_track in player_tracks for pid in player_track.keys())
+        self._update_centroids({pid for _, pid in sampled if pid in self.feature_sums})
+
+        pid_to_team = {}
+        for player_track in player_tracks:
+            for pid in player_track.keys():
+                if pid not in pid_to_team:
+                    team = self.get_team(pid)
+                    if team is not None:
+                        pid_to_team[pid] = team
+        return [{pid: pid_to_team[pid] for pid in player_track.keys() if pid in pid_to_team}
+                for player_track in player_tracks]
+
+    def mean_feature(self, pid):
+        return self.feature_sums[pid] / self.feature_counts[pid]
+
+    def _update_centroids(self, updated_pids):
+        long_pids = [pid for pid in self.feature_sums if self.seen[pid] >= self.min_track_frames]
+
+        if self.centroids is None:
+            if len(long_pids) < 2:
+                return
+            kmeans = KMeans(n_clusters=2, random_state=42)
+            labels = kmeans.fit_predict(np.array([self.mean_feature(pid) for pid in long_pids]))
+            self.centroids = kmeans.cluster_centers_.astype(np.float64)
+            self.centroid_counts = np.bincount(labels, minlength=2).astype(np.float64)
+            self.teams = {pid: int(label) for pid, label in zip(long_pids, labels)}
+            return
+
+        for pid in long_pids:
+            if pid not in updated_pids:
+                continue
+            feature = self.mean_feature(pid)
+            distances = np.linalg.norm(self.centroids - feature, axis=1)
+            nearest = int(np.argmin(distances))
+            team = self.teams.get(pid)
+            if team is None or distances[nearest] < (1 - self.switch_margin) * distances[team]:
+                team = self.teams[pid] = nearest
+            self.centroid_counts[team] += 1
+            self.centroids[team] += (feature - self.centroids[team]) / self.centroid_counts[team]
+
+    def get_team(self, pid):
+        # 1 / 2, short-lived ids go to the nearest centroid, None until the centroids exist
+        if self.centroids is None or pid not in self.feature_sums:
+            return None
+        if pid in self.teams:
+            return self.teams[pid] + 1
+        return int(np.argmin(np.linalg.norm(self.centroids - self.mean_feature(pid), axis=1))) + 1
+
+    def fitted_prototypes(self):
+        # the session's centroids in the TeamPrototypeStore format, None before two long tracks were clustered
+        long_pids = [pid for pid in self.feature_sums if self.seen[pid] >= self.min_track_frames]
+        if self.centroids is None or len(long_pids) < 2:
+            return None
+        features = np.array([self.mean_feature(pid) for pid in long_pids])
+        return {
+            "centroids": self.centroids.copy(),
+            "team_colors": self.team_colors,
+            "fit_distance": fit_distance(features, self.centroids),
+        }
+
+    @property
+    def team_colors(self):
+        if self.centroids is None:
+            return {1: (255, 255, 255), 2: (0, 0, 0)}
+        return {1: self.get_rgb_from_histogram(self.centroids[0]), 2: self.get_rgb_from_histogram(self.centroids[1])}
@@ -0,0 +1,98 @@
+import numpy as np
+from multiprocessing import get_context, shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+from .features import color_histograms, pack_crops, strip_histograms, NUM_BINS
+
+def _init_worker():
+    # one OpenCV thread per process, the pool itself is the parallelism
+    import cv2
+    cv2.setNumThreads(1)
+
+def _memmap_source(frames):
+    # (filename, offset, shape) when frames is a whole memory-mapped file, e.g. from the frame store
+    base = frames
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    if base is None or base.filename is None or base.shape != frames.shape or not frames.flags.c_contiguous:
+        return None
+    return base.filename, base.offset, frames.shape
+
+def _extract_frames(source, frame_ids, boxes, crop_factor):
+    # the page cache already shares the file between processes, each worker crops its own frame range
+    filename, offset, shape = source
+    frames = np.memmap(filename, dtype=np.uint8, mode="r", offset=offset, shape=shape)
+    return color_histograms(frames, frame_ids, boxes, crop_factor)
+
+def _extract_strip(name, start, stop, sizes):
+    # the parent owns and unlinks the block, spawned workers share its resource tracker
+    shm = shared_memory.SharedMemory(name=name)
+    strip = np.ndarray((1, stop - start, 3), dtype=np.uint8, buffer=shm.buf, offset=start * 3)
+    features = strip_histograms(strip, sizes)
+    del strip # the view has to go before the block can be closed
+    shm.close()
+    return features
+
+class ParallelFeatureExtractor():
+    """
+    Splits color histogram extraction over a pool of processes. Frames of a memory-mapped file (the frame
+    store) are mapped again by every worker, which crops and bins its own contiguous frame range. Anything
+    else (e.g. the dict of sampled frames read_frames_at returns) would have to be copied whole, so the
+    parent packs only the crops into a pixel strip in shared memory and the workers bin slices of it.
+    Small requests run in-process.
+    """
+    def __init__(self, num_workers, min_boxes_per_worker=64):
+        self.num_workers = num_workers
+        self.min_boxes_per_worker = min_boxes_per_worker
+        self.executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def extract(self, frames, frame_ids, boxes, crop_factor=0.4):
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        frame_ids = np.asarray(frame_ids, dtype=np.int64)
+        num_chunks = min(self.num_workers, len(boxes) // self.min_boxes_per_worker)
+        if num_chunks < 2:
+            return color_histograms(frames, frame_ids, boxes, crop_factor)
+
+        source = _memmap_source(frames) if isinstance(frames, np.ndarray) else None
+        if source is not None:
+            return self._extract_frames(source, frame_ids, boxes, crop_factor, num_chunks)
+        return self._extract_strip(frames, frame_ids, boxes, crop_factor, num_chunks)
+
+    def _extract_frames(self, source, frame_ids, boxes, crop_factor, num_chunks):
+        # contiguous frame ranges of about the same number of boxes, so each worker reads its own frames
+        order = np.argsort(frame_ids, kind="stable")
+        chunks = np.array_split(order, num_chunks)
+        futures = [
+            self.executor.submit(_extract_frames, source, frame_ids[chunk], boxes[chunk], crop_factor)
+            for chunk in chunks
+        ]
+        features = np.empty((len(boxes), NUM_BINS), dtype=np.float32)
+        for chunk, future in zip(chunks, futures):
+            features[chunk] = future.result()
+        return features
+
+    def _extract_strip(self, frames, frame_ids, boxes, crop_factor, num_chunks):
+        strip, sizes = pack_crops(frames, frame_ids, boxes, crop_factor)
+        if strip.shape[1] == 0:
+            return strip_histograms(strip, sizes)
+        shm = shared_memory.SharedMemory(create=True, size=strip.nbytes)
+        try:
+            np.ndarray(strip.shape, dtype=np.uint8, buffer=shm.buf)[:] = strip
+            # slices of about the same number of boxes, the strip keeps the boxes' order
+            bounds = np.linspace(0, len(sizes), num_chunks + 1).astype(int).tolist()
+            offsets = np.concatenate([[0], np.cumsum(sizes)]).tolist()
+            futures = [
+                self.executor.submit(_extract_strip, shm.name, offsets[lo], offsets[hi], sizes[lo:hi])
+                for lo, hi in zip(bounds[:-1], bounds[1:])
+            ]
+            return np.concatenate([future.result() for future in futures])
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
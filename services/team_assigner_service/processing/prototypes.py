@@ -0,0 +1,64 @@
+import os
+import json
+import numpy as np
+from botocore.exceptions import ClientError
+
+from shared.storage import get_s3, bucket_exists
+
+TEAM_PROTOTYPE_BUCKET = os.getenv("TEAM_PROTOTYPE_BUCKET", "basketball-team-prototypes")
+
+def match_centroids(centroids, reference):
+    # order of the two new centroids that keeps each closest to the reference team with the same number
+    straight = np.linalg.norm(centroids - reference, axis=1).sum()
+    crossed = np.linalg.norm(centroids[::-1] - reference, axis=1).sum()
+    return [0, 1] if straight <= crossed else [1, 0]
+
+def fit_distance(features, centroids):
+    # mean distance of the track features to their nearest centroid
+    distances = np.linalg.norm(features[:, None, :] - centroids[None, :, :], axis=2)
+    return float(distances.min(axis=1).mean())
+
+class TeamPrototypeStore():
+    """
+    Team centroids and colors per game, kept as JSON in MinIO (one object per game id) and cached in memory.
+    {"centroids": [[...], [...]], "team_colors": {"1": [r, g, b], "2": [r, g, b]}, "fit_distance": float}
+    """
+    def __init__(self, bucket=TEAM_PROTOTYPE_BUCKET):
+        self.bucket = bucket
+        self.cache = {}
+
+    def _key(self, game_id):
+        return f"{game_id}.json"
+
+    def load(self, game_id):
+        if game_id in self.cache:
+            return self.cache[game_id]
+        s3 = get_s3()
+        try:
+            body = s3.get_object(Bucket=self.bucket, Key=self._key(game_id))["Body"].read()
+        except ClientError as e:
+            # only a missing object (or bucket, before the first save) means no prototypes yet, outages and
+            # credential errors raise, a later save would otherwise overwrite the stored numbering
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "NoSuchBucket", "404"):
+                return None
+            raise
+        prototypes = json.loads(body)
+        prototypes["centroids"] = np.array(prototypes["centroids"])
+        prototypes["team_colors"] = {int(k): tuple(v) for k, v in prototypes["team_colors"].items()}
+        self.cache[game_id] = prototypes
+        print(f"[Prototypes] Loaded team prototypes for game {game_id}")
+        return prototypes
+
+    def save(self, game_id, prototypes):
+        s3 = get_s3()
+        if not bucket_exists(s3, self.bucket):
+            s3.create_bucket(Bucket=self.bucket)
+        body = json.dumps({
+            "centroids": np.asarray(prototypes["centroids"]).tolist(),
+            "team_colors": {str(k): list(v) for k, v in prototypes["team_colors"].items()},
+            "fit_distance": prototypes["fit_distance"],
+        })
+        s3.put_object(Bucket=self.bucket, Key=self._key(game_id), Body=body.encode("utf-8"),
+                      ContentType="application/json")
+        self.cache[game_id] = prototypes
+        print(f"[Prototypes] Saved team prototypes for game {game_id}")
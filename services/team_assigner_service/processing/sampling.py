@@ -0,0 +1,46 @@
+import numpy as np
+from collections import defaultdict
+
+from shared.utils import frame_track_arrays
+
+def box_occlusion(boxes):
+    # share of each (N, 4) xyxy box covered by the most overlapping other box
+    x1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    np.fill_diagonal(inter, 0)
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter.max(axis=1) / np.maximum(area, 1e-9)
+
+def sample_track_frames(player_tracks, samples_per_track=8, max_occlusion=0.1):
+    """
+    Picks at most samples_per_track frames per track id, returns {frame_id: [pid, ...]}.
+    Each track's frames are split into samples_per_track equal runs and the least occluded,
+    then largest, box of every run is taken. Samples covered more than max_occlusion by another
+    player are dropped, unless that would leave the track without any.
+    """
+    appearances = defaultdict(list) # pid -> [(frame_id, occlusion, area)]
+    for frame_id, player_track in enumerate(player_tracks):
+        if not player_track:
+            continue
+        track_ids, boxes = frame_track_arrays(player_track)
+        pids = track_ids.tolist()
+        boxes = boxes.astype(np.float64)
+        occlusion = box_occlusion(boxes) if len(boxes) > 1 else np.zeros(1)
+        area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        for pid, occ, a in zip(pids, occlusion.tolist(), area.tolist()):
+            appearances[pid].append((frame_id, occ, a))
+
+    samples = defaultdict(list)
+    for pid, seen in appearances.items():
+        frame_ids, occlusion, area = (np.array(col) for col in zip(*seen))
+        picked = []
+        for run in np.array_split(np.arange(len(frame_ids)), min(samples_per_track, len(frame_ids))):
+            best = run[np.lexsort((-area[run], occlusion[run]))[0]]
+            picked.append(best)
+        clear = [i for i in picked if occlusion[i] <= max_occlusion]
+        for i in clear or picked:
+            samples[int(frame_ids[i])].append(pid)
+    return dict(samples)
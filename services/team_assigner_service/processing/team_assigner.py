@@ -1,45 +1,41 @@
 import cv2
 import numpy as np
-from PIL import Image
-from collections import defaultdict
+from collections import defaultdict, Counter
+from collections.abc import Mapping
 from sklearn.cluster import KMeans
 
+from .sampling import sample_track_frames
+from .features import color_histograms
+from .prototypes import match_centroids, fit_distance
+
 import sys 
 sys.path.append('../')
 
 class TeamAssigner:
-    def __init__(self, crop_factor = 0.3):
+    def __init__(self, crop_factor = 0.3, samples_per_track = 8, min_track_frames = 4, refit_ratio = 1.5, min_fit_distance = 0.05,
+                 feature_extractor = None):
         self.crop_factor = crop_factor
-
-    def get_center_crop(self, img_array, crop_factor=0.4, skew_factor=0.1):
-        h, w, _ = img_array.shape
-        h_center, w_center = h // 2, w // 2
-        h_crop, w_crop = int(h * crop_factor), int(w * crop_factor)
-        h_skew = int(h * skew_factor)
-
-        y1 = max(0, h_center - h_crop // 2 - h_skew)
-        y2 = min(h, h_center + h_crop // 2 - h_skew)
-        x1 = max(0, w_center - w_crop // 2)
-        x2 = min(w, w_center + w_crop // 2)
-        
-        return img_array[y1:y2, x1:x2]
-    
-    def _extract_features(self, pil_images):
-        features = []
-        bins = (8, 4, 4) 
-        
-        for pil in pil_images:
-            img = np.array(pil)
-            img_crop = self.get_center_crop(img, crop_factor=self.crop_factor)
-
-            hsv = cv2.cvtColor(img_crop, cv2.COLOR_RGB2HSV)
-
-            hist = cv2.calcHist([hsv], [0, 1, 2], None, bins, [0, 180, 0, 256, 0, 256])
-            cv2.normalize(hist, hist)
-
-            features.append(hist.flatten())
-
-        return np.array(features)
+        self.feature_extractor = feature_extractor # e.g. a ParallelFeatureExtractor, in-process when None
+        self.samples_per_track = samples_per_track
+        self.min_track_frames = min_track_frames
+        self.refit_ratio = refit_ratio
+        self.min_fit_distance = min_fit_distance
+
+    def extract_features(self, vid_frames, frame_ids, boxes):
+        # (N, 128) color histograms of the players' jersey regions, all crops in one batch
+        if self.feature_extractor is not None:
+            return self.feature_extractor.extract(vid_frames, frame_ids, boxes, crop_factor=self.crop_factor)
+        return color_histograms(vid_frames, frame_ids, boxes, crop_factor=self.crop_factor)
+
+    def readable_samples(self, vid_frames, sampled):
+        # (frame_id, pid) samples whose frame could be decoded, read_frames_at leaves unreadable frames out
+        if isinstance(vid_frames, Mapping):
+            kept = [(frame_id, pid) for frame_id, pid in sampled if frame_id in vid_frames]
+        else:
+            kept = [(frame_id, pid) for frame_id, pid in sampled if frame_id < len(vid_frames)]
+        if len(kept) < len(sampled):
+            print(f" Dropped {len(sampled) - len(kept)} samples of unreadable frames")
+        return kept
 
     def get_rgb_from_histogram(self, hist_vector, bins=(8, 4, 4)):
         hist_3d = hist_vector.reshape(bins)
@@ -59,60 +55,82 @@ class TeamAssigner:
 
         return tuple(map(int, rgb_pixel))
     
-    def get_player_teams_global(self, vid_frames, player_tracks):
+    def sample_frames(self, player_tracks):
+        # {frame_id: [pid, ...]}, the only frames get_player_teams_global needs to look at
+        return sample_track_frames(player_tracks, samples_per_track=self.samples_per_track)
+
+    def get_player_teams_global(self, vid_frames, player_tracks, samples=None):
+        frame_assignments, team_colors, _ = self.assign_teams(vid_frames, player_tracks, samples)
+        return frame_assignments, team_colors
+
+    def assign_teams(self, vid_frames, player_tracks, samples=None, prototypes=None):
+        """
+        Returns (frame_assignments, team_colors, fitted_prototypes).
+        With prototypes of earlier clips (see TeamPrototypeStore) the tracks are assigned to the nearest
+        prototype, and only re-clustered when their mean distance grew past refit_ratio times the distance
+        the prototypes were fitted with. fitted_prototypes is None unless clustering ran.
+        """
+        # vid_frames only has to support vid_frames[frame_id] for the sampled frames, e.g. a dict from read_frames_at
+        if samples is None:
+            samples = self.sample_frames(player_tracks)
+
         player_features_map = defaultdict(list)
-        frame_assignments = [dict() for _ in range(len(vid_frames))]
+        frame_assignments = [dict() for _ in range(len(player_tracks))]
 
-        for frame_id, player_track in enumerate(player_tracks):
-            frame = vid_frames[frame_id]
-            
-            frame_crops = []
-            frame_pids = []
-
-            for pid, info in player_track.items():
-                x1, y1, x2, y2 = map(int, info['bbox'])
-                crop = frame[y1:y2, x1:x2]
-
-                pil_img = Image.fromarray(crop)
-                
-                frame_crops.append(pil_img)
-                frame_pids.append(pid)
-
-            if not frame_crops:
-                continue
-
-            feats = self._extract_features(frame_crops)
-            
-            for pid, feat in zip(frame_pids, feats):
+        sampled = [(frame_id, pid) for frame_id in sorted(samples) for pid in samples[frame_id]]
+        sampled = self.readable_samples(vid_frames, sampled)
+        frame_ids = [frame_id for frame_id, _ in sampled]
+        boxes = [player_tracks[frame_id][pid]['bbox'] for frame_id, pid in sampled]
+        feats = self.extract_features(vid_frames, frame_ids, boxes)
+
+        for (_, pid), feat in zip(sampled, feats):
+            if feat.any(): # empty crop
                 player_features_map[pid].append(feat)
-        
+
+        if not player_features_map:
+            team_colors = prototypes["team_colors"] if prototypes is not None else {1: (255, 255, 255), 2: (0, 0, 0)}
+            return frame_assignments, team_colors, None
+
+        # Id should exist for atleast this number of frames to be used in kmeans
+        seen = Counter(pid for player_track in player_tracks for pid in player_track.keys())
         unique_pids = list(player_features_map.keys())
-        averaged_features = []
-
-        for pid in unique_pids:
-            # Average features per player id for global embedding (Remove noise)
-            if len(player_features_map[pid]) > 3: # Id should exist for atleast this number of frames to be used in kmeans
-                feats = np.array(player_features_map[pid])
-                avg_feat = np.mean(feats, axis=0)
-                averaged_features.append(avg_feat)
-            else:
-                averaged_features.append(averaged_features[-1])
-
-        if not unique_pids:
-            return frame_assignments
-
-        print(f" # Player ID's: {len(unique_pids)}")
-        
-        kmeans = KMeans(n_clusters=2, random_state=42)
-        
-        if len(unique_pids) >= 2:
-            labels = kmeans.fit_predict(averaged_features)
-
-            team1_color = self.get_rgb_from_histogram(kmeans.cluster_centers_[0], bins=(8, 4, 4))
-            team2_color = self.get_rgb_from_histogram(kmeans.cluster_centers_[1], bins=(8, 4, 4))
+        # Average features per player id for global embedding (Remove noise)
+        averaged_features = np.array([np.mean(player_features_map[pid], axis=0) for pid in unique_pids])
+        is_long = np.array([seen[pid] >= self.min_track_frames for pid in unique_pids])
+
+        print(f" # Player ID's: {len(unique_pids)}, sampled frames: {len(samples)}/{len(player_tracks)}")
+
+        centroids, fitted_prototypes = None, None
+        if prototypes is not None:
+            centroids, team_colors = prototypes["centroids"], prototypes["team_colors"]
+            if is_long.sum() >= 2:
+                clip_fit = fit_distance(averaged_features[is_long], centroids)
+                if clip_fit > self.refit_ratio * max(prototypes["fit_distance"], self.min_fit_distance):
+                    print(f" Team prototypes no longer fit ({clip_fit:.3f} vs {prototypes['fit_distance']:.3f}), re-clustering")
+                    centroids = None
+
+        if centroids is None and is_long.sum() >= 2:
+            kmeans = KMeans(n_clusters=2, random_state=42)
+            kmeans.fit(averaged_features[is_long])
+            centroids = kmeans.cluster_centers_
+            if prototypes is not None:
+                # keep the team numbering of the earlier clips
+                centroids = centroids[match_centroids(centroids, prototypes["centroids"])]
+
+            team1_color = self.get_rgb_from_histogram(centroids[0], bins=(8, 4, 4))
+            team2_color = self.get_rgb_from_histogram(centroids[1], bins=(8, 4, 4))
             team_colors = {1: team1_color, 2: team2_color}
+            fitted_prototypes = {
+                "centroids": centroids,
+                "team_colors": team_colors,
+                "fit_distance": fit_distance(averaged_features[is_long], centroids),
+            }
+
+        if centroids is not None:
+            # short-lived ids do not shape the clusters, they are only assigned to the nearest one
+            labels = np.linalg.norm(averaged_features[:, None, :] - centroids[None, :, :], axis=2).argmin(axis=1)
         else:
-            labels = [1] * len(unique_pids) # Fallback in case of not enough players
+            labels = [0] * len(unique_pids) # Fallback in case of not enough players
             team_colors = {1: (255, 255, 255), 2: (0, 0, 0)}
 
         pid_to_team = {pid: int(label) + 1 for pid, label in zip(unique_pids, labels)}
@@ -123,7 +141,7 @@ class TeamAssigner:
                     team_id = pid_to_team[pid]
                     frame_assignments[frame_id][pid] = team_id
 
-        return frame_assignments, team_colors
+        return frame_assignments, team_colors, fitted_prototypes
 
-    def get_player_teams_over_frames(self, vid_frames, player_tracks):
-        return self.get_player_teams_global(vid_frames, player_tracks)
\ No newline at end of file
+    def get_player_teams_over_frames(self, vid_frames, player_tracks, samples=None):
+        return self.get_player_teams_global(vid_frames, player_tracks, samples)
@@ -1,16 +1,31 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Body
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 import uvicorn
 import tempfile
 from pathlib import Path
 import json
+import os
+import uuid
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from botocore.exceptions import BotoCoreError, ClientError
 
-from shared.utils import read_video
+from shared.frame_store import open_frames, load_video_frames_by_reference, video_hash as hash_video_file
+from shared.storage import download_cached
+from shared.utils import TRACKS_MEDIA_TYPE, decode_tracks, arrays_to_tracks, json_to_tracks, read_frames_at
 from team_assigner_service.processing.team_assigner import TeamAssigner
+from team_assigner_service.processing.online import OnlineTeamAssigner
+from team_assigner_service.processing.prototypes import TeamPrototypeStore
+from team_assigner_service.processing.parallel import ParallelFeatureExtractor
 
 from prometheus_fastapi_instrumentator import Instrumentator
 
+def deserialize_tracks(serialized):
+    # [[{"track_id", "bbox"}, ...], ...] as sent by the detector -> per-frame {track_id: {"bbox": ...}}
+    return [{int(obj["track_id"]): {"bbox": obj["bbox"]} for obj in frame} for frame in serialized]
+
 def serialize_team_assignments(assignments):
     out = []
     for frame in assignments:
@@ -23,48 +38,198 @@ def serialize_team_assignments(assignments):
         out.append(frame_list)
     return out
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    sweeper = asyncio.create_task(sweep_online_sessions())
+    yield
+    sweeper.cancel()
+    await asyncio.gather(sweeper, return_exceptions=True)
+    if feature_extractor is not None:
+        feature_extractor.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 Instrumentator().instrument(app).expose(app)
 
-team_assigner = TeamAssigner(crop_factor=0.2)
+# crops and histograms can be computed on a pool of processes over the shared frames, in-process by default
+TEAM_FEATURE_WORKERS = int(os.getenv("TEAM_FEATURE_WORKERS", "0"))
+feature_extractor = ParallelFeatureExtractor(TEAM_FEATURE_WORKERS) if TEAM_FEATURE_WORKERS > 1 else None
+
+team_assigner = TeamAssigner(crop_factor=0.2, samples_per_track=int(os.getenv("TEAM_SAMPLES_PER_TRACK", "8")),
+                             feature_extractor=feature_extractor)
+# team centroids and colors per game, later clips of a game are assigned without re-clustering
+prototype_store = TeamPrototypeStore()
+
+async def load_prototypes(game_id):
+    # None without a game id or stored prototypes, an unreachable store fails the request instead of refitting
+    if not game_id:
+        return None
+    try:
+        return await asyncio.to_thread(prototype_store.load, game_id)
+    except (BotoCoreError, ClientError) as e:
+        raise HTTPException(status_code=503, detail=f"Team prototypes for game {game_id} could not be loaded: {e}")
+
+def load_sampled_frames(video_path, frame_ids):
+    # decoded frames are mapped from the store when another service already decoded the video,
+    # otherwise only the sampled frames are decoded
+    frames = open_frames(hash_video_file(video_path))
+    if frames is not None:
+        return frames
+    return read_frames_at(video_path, frame_ids)
 
 @app.post("/assign_teams")
 async def assign_teams(
-    file: UploadFile = File(...),
+    file: UploadFile = File(None),
     player_tracks_file: UploadFile = File(...,
-        description="Deserialized Python-style tracks as JSON")
+        description=f"Deserialized Python-style tracks as JSON, or {TRACKS_MEDIA_TYPE} columnar tracks"),
+    video_uri: str = Form(None),
+    video_hash: str = Form(None),
+    game_id: str = Form(None, description="Clips with the same game id share team prototypes and team numbering"),
 ):
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Save video
-        tmp_video_path = Path(tmpdir) / file.filename
-        with tmp_video_path.open("wb") as f:
-            f.write(await file.read())
+    if file is None and not video_uri and not video_hash:
+        raise HTTPException(status_code=400, detail="Provide a file, a video_uri or a video_hash")
 
+    with tempfile.TemporaryDirectory() as tmpdir:
         # Save + load player_tracks JSON
         tmp_tracks_path = Path(tmpdir) / player_tracks_file.filename
         with tmp_tracks_path.open("wb") as f:
             f.write(await player_tracks_file.read())
 
-        with tmp_tracks_path.open("r") as f:
-            player_tracks = json.load(f)
+        if player_tracks_file.content_type == TRACKS_MEDIA_TYPE:
+            tables = decode_tracks(tmp_tracks_path.read_bytes())
+            player_tracks = arrays_to_tracks(*tables["player_tracks"])
+        else:
+            with tmp_tracks_path.open("r") as f:
+                player_tracks = json_to_tracks(json.load(f))
+
+        # only a few well-spread, unoccluded frames per track id are looked at
+        samples = team_assigner.sample_frames(player_tracks)
 
-    # Read video frames
-    frames = read_video(str(tmp_video_path))
+        try:
+            frames = await asyncio.to_thread(open_frames, video_hash) if video_hash else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if frames is None:
+            if file is not None:
+                # Save video
+                tmp_video_path = Path(tmpdir) / file.filename
+                with tmp_video_path.open("wb") as f:
+                    f.write(await file.read())
+                frames = await asyncio.to_thread(load_sampled_frames, str(tmp_video_path), samples.keys())
+            elif video_uri:
+                # downloading and decoding block, keep them off the event loop
+                video_path = await asyncio.to_thread(download_cached, video_uri)
+                frames = await asyncio.to_thread(load_sampled_frames, video_path, samples.keys())
+            else:
+                raise HTTPException(status_code=404,
+                                    detail=f"Video {video_hash} is not in the frame store and no video_uri was given")
 
-    team_assignments, team_colors = team_assigner.get_player_teams_over_frames(
+    prototypes = await load_prototypes(game_id)
+    # off the event loop, feature extraction may wait on the worker pool
+    team_assignments, team_colors, fitted_prototypes = await asyncio.to_thread(
+        team_assigner.assign_teams,
         vid_frames=frames,
         player_tracks=player_tracks,
+        samples=samples,
+        prototypes=prototypes,
     )
+    if game_id and fitted_prototypes is not None:
+        await asyncio.to_thread(prototype_store.save, game_id, fitted_prototypes)
 
     # Serialize
     payload = {
         "team_assignments": serialize_team_assignments(team_assignments),
         "team_colors": team_colors
     }
+    if game_id:
+        payload["team_prototypes"] = "fitted" if fitted_prototypes is not None else "reused"
 
     safe = jsonable_encoder(payload)
     return JSONResponse(content=safe)
 
+# online sessions, one per video being streamed, memory per session grows with the tracks only
+online_sessions = {}
+MAX_ONLINE_SESSIONS = int(os.getenv("MAX_ONLINE_SESSIONS", "16"))
+# sessions nobody closed (the client crashed or timed out) are dropped after this many idle seconds
+ONLINE_SESSION_TTL = float(os.getenv("ONLINE_SESSION_TTL", "600"))
+
+def expire_online_sessions():
+    now = time.monotonic()
+    for session_id, session in list(online_sessions.items()):
+        if not session["lock"].locked() and now - session["last_used"] > ONLINE_SESSION_TTL:
+            del online_sessions[session_id]
+            print(f"[Online] Session {session_id} expired after {ONLINE_SESSION_TTL:.0f} s idle")
+
+async def sweep_online_sessions():
+    while True:
+        await asyncio.sleep(max(ONLINE_SESSION_TTL / 4, 1))
+        expire_online_sessions()
+
+@app.post("/assign_teams/online")
+async def open_online_session(
+    video_uri: str = Form(None),
+    video_hash: str = Form(None),
+    game_id: str = Form(None),
+):
+    if not video_uri and not video_hash:
+        raise HTTPException(status_code=400, detail="Provide a video_uri or a video_hash")
+    expire_online_sessions()
+    if len(online_sessions) >= MAX_ONLINE_SESSIONS:
+        raise HTTPException(status_code=503, detail="Too many open online sessions")
+    try:
+        _, frames = await asyncio.to_thread(load_video_frames_by_reference, video_hash=video_hash, video_uri=video_uri)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # prototypes of the game seed the centroids, so the session starts labeling with the first chunk
+    prototypes = await load_prototypes(game_id)
+    session_id = uuid.uuid4().hex
+    online_sessions[session_id] = {
+        "assigner": OnlineTeamAssigner(crop_factor=0.2, prototypes=prototypes),
+        "frames": frames,
+        "lock": asyncio.Lock(),
+        "last_used": time.monotonic(),
+        "game_id": game_id,
+    }
+    return {"session_id": session_id}
+
+@app.post("/assign_teams/online/{session_id}")
+async def assign_teams_online(session_id: str, chunk: dict = Body(...)):
+    """Chunk: {"start_frame", "player_tracks"} with player tracks as the detector serializes them."""
+    if session_id not in online_sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    session = online_sessions[session_id]
+    assigner = session["assigner"]
+
+    # chunks of one session update the same centroids, they are applied one at a time
+    async with session["lock"]:
+        team_assignments = await asyncio.to_thread(
+            assigner.update, session["frames"], deserialize_tracks(chunk["player_tracks"]), chunk["start_frame"]
+        )
+        payload = {
+            "team_assignments": serialize_team_assignments(team_assignments),
+            "team_colors": assigner.team_colors,
+        }
+        session["last_used"] = time.monotonic()
+    return JSONResponse(content=jsonable_encoder(payload))
+
+@app.delete("/assign_teams/online/{session_id}")
+async def close_online_session(session_id: str):
+    if session_id not in online_sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    session = online_sessions.pop(session_id)
+    assigner = session["assigner"]
+
+    # the session's centroids become the game's prototypes, like a fit of /assign_teams
+    prototypes = assigner.fitted_prototypes() if session["game_id"] else None
+    if prototypes is not None:
+        try:
+            await asyncio.to_thread(prototype_store.save, session["game_id"], prototypes)
+        except (BotoCoreError, ClientError) as e:
+            print(f"[Prototypes] Saving team prototypes of session {session_id} failed: {e}")
+    return JSONResponse(content=jsonable_encoder({"team_colors": assigner.team_colors}))
+
 @app.get("/ping")
 def ping():
     return {"status": "ok"}
@@ -3,6 +3,7 @@ import os
 # Defaults
 LOCAL_HOST = "127.0.0.1"
 DEFAULT_PROCESS = f"http://{LOCAL_HOST}:8000/process"
+DEFAULT_JOBS    = f"http://{LOCAL_HOST}:8000/jobs"
 DEFAULT_STITCH  = f"http://{LOCAL_HOST}:8003/stitch"       # Local uses port 8003
 DEFAULT_WARP    = f"http://{LOCAL_HOST}:8003/warp_panorama" # Local uses port 8003
 DEFAULT_VIEWER  = f"http://{LOCAL_HOST}:8004"               # Local uses port 8004
@@ -15,6 +16,7 @@ DEFAULT_PING_ORCHESTRATOR_SERVICE   = f"http://{LOCAL_HOST}:8000/ping"
 
 # Load from env
 API_PROCESS = os.getenv("API_URL_PROCESS", DEFAULT_PROCESS)
+API_JOBS    = os.getenv("API_URL_JOBS", DEFAULT_JOBS)
 API_STITCH  = os.getenv("API_URL_STITCH", DEFAULT_STITCH)
 API_WARP    = os.getenv("API_URL_WARP", DEFAULT_WARP)
 VIEWER_BASE = os.getenv("API_URL_VIEWER", DEFAULT_VIEWER)
@@ -25,6 +27,11 @@ PING_TEAM_ASSIGNER_SERVICE  = os.getenv("PING_TEAM_ASSIGNER_SERVICE", DEFAULT_PI
 PING_DETECTOR_SERVICE       = os.getenv("PING_DETECTOR_SERVICE", DEFAULT_PING_DETECTOR_SERVICE)
 PING_ORCHESTRATOR_SERVICE   = os.getenv("PING_ORCHESTRATOR_SERVICE", DEFAULT_PING_ORCHESTRATOR_SERVICE)
 
+# Job polling
+REQUEST_TIMEOUT   = float(os.getenv("REQUEST_TIMEOUT", "30"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+JOB_TIMEOUT       = float(os.getenv("JOB_TIMEOUT", "7200"))
+
 # Buckets
 BUCKET_RAW = "basketball-raw-videos"
 BUCKET_PROCESSED = "basketball-processed"
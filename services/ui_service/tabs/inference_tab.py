@@ -1,6 +1,7 @@
 import os
 import cv2
 import json
+import time
 import requests
 import numpy as np
 import gradio as gr
@@ -33,13 +34,33 @@ def run_inference(video_file, court_name):
     upload_video(local_path, basename, config.BUCKET_RAW)
     
     try:
-        resp = requests.post(config.API_PROCESS, params={
+        resp = requests.post(config.API_JOBS, params={
             "video_name": video_name, 
             "reference_court": court_name
-        })
+        }, timeout=config.REQUEST_TIMEOUT)
     except:
         return [None]*5 + ["Backend unreachable"]
 
+    if resp.status_code != 202:
+        return [None]*5 + [f"Error: {resp.text}"]
+
+    job_id = resp.json()["job_id"]
+    deadline = time.time() + config.JOB_TIMEOUT
+    while True:
+        try:
+            job = requests.get(f"{config.API_JOBS}/{job_id}", timeout=config.REQUEST_TIMEOUT).json()
+        except:
+            return [None]*5 + ["Backend unreachable"]
+
+        if job["status"] == "completed":
+            break
+        if job["status"] == "failed":
+            return [None]*5 + [f"Error: {job['error']}"]
+        if time.time() > deadline:
+            return [None]*5 + [f"Timed out waiting for job {job_id}"]
+        time.sleep(config.JOB_POLL_INTERVAL)
+
+    resp = requests.get(f"{config.API_JOBS}/{job_id}/result", timeout=config.REQUEST_TIMEOUT)
     if resp.status_code != 200:
         return [None]*5 + [f"Error: {resp.text}"]
 
@@ -1 +1 @@
-from .storage import download_to_temp, upload_video, s3_upload, list_bucket_contents, delete_video
+from .storage import download_to_temp, upload_video, s3_upload, list_bucket_contents, delete_video, get_object_etag, download_cached, parse_s3_uri
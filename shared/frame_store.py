@@ -0,0 +1,154 @@
+import os
+import re
+import json
+import fcntl
+import hashlib
+import cv2
+import numpy as np
+
+from .storage import download_cached
+
+FRAME_STORE_DIR = os.getenv("FRAME_STORE_DIR", "/frame_store")
+FRAME_STORE_MAX_GB = float(os.getenv("FRAME_STORE_MAX_GB", "50"))
+
+def video_hash(video_path, block_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(video_path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            sha.update(block)
+    return sha.hexdigest()
+
+def check_video_hash(digest):
+    # digests name files in the store, anything but a SHA-256 hex digest (e.g. "../x" from a request) could escape it
+    if not isinstance(digest, str) or re.fullmatch(r"[0-9a-f]{64}", digest) is None:
+        raise ValueError(f"Invalid video hash {digest!r}, expected 64 lowercase hex characters")
+    return digest
+
+def _store_paths(digest, store_dir):
+    check_video_hash(digest)
+    base = os.path.join(store_dir, digest)
+    return f"{base}.frames", f"{base}.json", f"{base}.lock"
+
+def open_frames(digest, store_dir=FRAME_STORE_DIR):
+    # zero-copy, read-only view of a stored video, None if it has not been decoded yet, ValueError for a malformed digest
+    frames_path, meta_path, _ = _store_paths(digest, store_dir)
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+
+    shape = (meta["frame_count"], meta["height"], meta["width"], 3)
+    if meta["frame_count"] == 0:
+        return np.zeros(shape, dtype=np.uint8)
+
+    os.utime(meta_path) # mark as recently used for eviction
+    return np.asarray(np.memmap(frames_path, dtype=np.uint8, mode="r", shape=shape))
+
+def get_video_meta(digest, store_dir=FRAME_STORE_DIR):
+    _, meta_path, _ = _store_paths(digest, store_dir)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        return json.load(f)
+
+def _decode_to_store(video_path, digest, store_dir):
+    frames_path, meta_path, _ = _store_paths(digest, store_dir)
+    tmp_frames_path = f"{frames_path}.{os.getpid()}.tmp"
+
+    capture = cv2.VideoCapture(video_path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 24.0
+    frame_count, height, width = 0, 0, 0
+
+    with open(tmp_frames_path, "wb") as f:
+        while True:
+            returned, frame = capture.read()
+            if not returned:
+                break
+            height, width = frame.shape[:2]
+            f.write(np.ascontiguousarray(frame).tobytes())
+            frame_count += 1
+    capture.release()
+
+    os.replace(tmp_frames_path, frames_path)
+
+    # metadata is written last, its presence marks the frame file as complete
+    meta = {
+        "video_hash": digest,
+        "frame_count": frame_count,
+        "height": height,
+        "width": width,
+        "fps": fps,
+    }
+    tmp_meta_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_meta_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta_path, meta_path)
+
+    print(f"[FrameStore] Decoded {frame_count} frames of {video_path} -> {frames_path}")
+
+def evict_frame_store(store_dir=FRAME_STORE_DIR, max_gb=FRAME_STORE_MAX_GB, keep=None):
+    # drop least recently used videos until the store fits in max_gb
+    entries = []
+    for name in os.listdir(store_dir):
+        if not name.endswith(".json"):
+            continue
+        digest = name[:-len(".json")]
+        frames_path, meta_path, _ = _store_paths(digest, store_dir)
+        size = os.path.getsize(frames_path) if os.path.exists(frames_path) else 0
+        entries.append((os.path.getmtime(meta_path), digest, size))
+
+    total = sum(size for _, _, size in entries)
+    max_bytes = max_gb * (1 << 30)
+    for _, digest, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if digest == keep:
+            continue
+        frames_path, meta_path, _ = _store_paths(digest, store_dir)
+        os.remove(meta_path)
+        if os.path.exists(frames_path):
+            os.remove(frames_path)
+        total -= size
+        print(f"[FrameStore] Evicted {digest}")
+
+def load_video_frames(video_path, store_dir=FRAME_STORE_DIR):
+    """Returns (video_hash, frames), frames is a (N, H, W, 3) uint8 memmap shared by all services."""
+    os.makedirs(store_dir, exist_ok=True)
+    digest = video_hash(video_path)
+
+    frames = open_frames(digest, store_dir)
+    if frames is not None:
+        return digest, frames
+
+    # only one process decodes a given video, the others wait and then map the result
+    _, _, lock_path = _store_paths(digest, store_dir)
+    with open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            frames = open_frames(digest, store_dir)
+            if frames is None:
+                _decode_to_store(video_path, digest, store_dir)
+                evict_frame_store(store_dir, keep=digest)
+                frames = open_frames(digest, store_dir)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    return digest, frames
+
+def load_video_frames_by_reference(video_hash=None, video_uri=None, store_dir=FRAME_STORE_DIR):
+    """
+    Maps frames by hash when they are already in the store, otherwise pulls video_uri through the local cache.
+    Raises ValueError for a malformed video_hash before touching the store.
+    """
+    if video_hash:
+        check_video_hash(video_hash)
+        frames = open_frames(video_hash, store_dir)
+        if frames is not None:
+            return video_hash, frames
+    if video_uri:
+        return load_video_frames(download_cached(video_uri), store_dir)
+    raise FileNotFoundError(f"Video {video_hash} is not in the frame store and no video_uri was given")
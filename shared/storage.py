@@ -1,5 +1,6 @@
 import os
 import boto3
+import hashlib
 import tempfile
 from botocore.client import Config
 from dotenv import load_dotenv
@@ -10,6 +11,8 @@ local_minio_key = os.getenv("MINIO_ENDPOINT")
 MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", local_minio_key)
 MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
 MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin123")
+VIDEO_CACHE_DIR = os.getenv("VIDEO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "video_cache"))
+VIDEO_CACHE_MAX_GB = float(os.getenv("VIDEO_CACHE_MAX_GB", "20"))
 
 def get_s3():
     return boto3.client(
@@ -35,6 +38,11 @@ def list_bucket_contents(bucket_name):
 
     return [obj["Key"] for obj in objects["Contents"]]
 
+def get_object_etag(key, bucket):
+    s3 = get_s3()
+    head = s3.head_object(Bucket=bucket, Key=key)
+    return head["ETag"].strip('"')
+
 def bucket_exists(s3, BUCKET_NAME):
     buckets = [b["Name"] for b in s3.list_buckets()["Buckets"]]
     if BUCKET_NAME not in buckets:
@@ -121,4 +129,64 @@ def download_to_temp(key, bucket):
     s3.download_file(bucket, key, tmp_path)
     print("Download complete!")
 
-    return tmp_path
\ No newline at end of file
+    return tmp_path
+
+def parse_s3_uri(uri):
+    bucket, key = uri.replace("s3://", "").split("/", 1)
+    return bucket, key
+
+def evict_video_cache(cache_dir=VIDEO_CACHE_DIR, max_gb=VIDEO_CACHE_MAX_GB, keep=None):
+    # drop least recently used videos until the cache fits in max_gb, like the frame store
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.endswith(".tmp"): # downloads in progress
+            continue
+        try:
+            entries.append((os.path.getmtime(path), path, os.path.getsize(path)))
+        except FileNotFoundError: # evicted by another service sharing the cache
+            continue
+
+    total = sum(size for _, _, size in entries)
+    max_bytes = max_gb * (1 << 30)
+    for _, path, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        print(f"[VideoCache] Evicted {path}")
+
+def download_cached(uri, cache_dir=VIDEO_CACHE_DIR):
+    # objects are cached by bucket, key and ETag, so a re-uploaded object is fetched again
+    s3 = get_s3()
+    bucket, key = parse_s3_uri(uri)
+    etag = s3.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+
+    _, ext = os.path.splitext(key)
+    digest = hashlib.sha256(f"{bucket}/{key}:{etag}".encode("utf-8")).hexdigest()
+    local_path = os.path.join(cache_dir, f"{digest}{ext}")
+    if os.path.exists(local_path):
+        print(f"Cache hit for {uri} -> {local_path}")
+        os.utime(local_path) # mark as recently used for eviction
+        return local_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # a temp file of its own per download, threads of one process may fetch the same object at once
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f"{digest}.", suffix=".tmp")
+    os.close(fd)
+    print(f"Downloading {uri} -> {local_path}")
+    try:
+        s3.download_file(bucket, key, tmp_path)
+        os.replace(tmp_path, local_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    print("Download complete!")
+    evict_video_cache(cache_dir, keep=local_path)
+
+    return local_path
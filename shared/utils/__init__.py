@@ -1,2 +1,16 @@
-from .video_utils import read_video, save_video
-from .bbox_utils import get_center_bbox, get_width_bbox, get_straight_line_distance
\ No newline at end of file
+from .video_utils import read_video, read_frames_at, open_video_writer, abort_video_writer, save_video
+from .bbox_utils import get_center_bbox, get_width_bbox, get_straight_line_distance, box_iou, match_boxes
+from .track_utils import (
+    TRACKS_MEDIA_TYPE,
+    tracks_to_arrays,
+    arrays_to_tracks,
+    json_to_tracks,
+    TrackColumns,
+    FrameTracks,
+    frame_track_arrays,
+    frame_arrays_to_columns,
+    frame_arrays_to_tracks,
+    encode_tracks,
+    encode_track_columns,
+    decode_tracks,
+)
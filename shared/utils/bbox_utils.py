@@ -1,3 +1,5 @@
+import numpy as np
+
 def get_center_bbox(bbox):
     x1,y1,x2,y2 = bbox
     return int((x1+x2)/2), int((y1+y2)/2)
@@ -7,4 +9,30 @@ def get_width_bbox(bbox):
     return x2-x1
 
 def get_straight_line_distance(p1, p2):
-    return ((p1[0]-p2[0])**2 + (p1[1]-p2[1])**2)**0.5
\ No newline at end of file
+    return ((p1[0]-p2[0])**2 + (p1[1]-p2[1])**2)**0.5
+
+def box_iou(a, b):
+    # (N, 4) x (M, 4) xyxy -> (N, M)
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+def match_boxes(overlap, min_iou=0.5):
+    # greedy one-to-one (row, col) pairs on an IoU matrix, highest overlap first
+    overlap = overlap.copy()
+    pairs = []
+    for _ in range(min(overlap.shape)):
+        i, j = np.unravel_index(np.argmax(overlap), overlap.shape)
+        if overlap[i, j] < min_iou:
+            break
+        pairs.append((int(i), int(j)))
+        overlap[i, :] = 0
+        overlap[:, j] = 0
+    return pairs
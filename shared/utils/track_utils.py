@@ -0,0 +1,148 @@
+import io
+import numpy as np
+from collections.abc import Mapping, Sequence
+
+TRACKS_MEDIA_TYPE = "application/x-npz"
+
+def tracks_to_arrays(tracks):
+    # per-frame dicts -> columnar (frame_idx, track_id, bbox) arrays
+    if isinstance(tracks, TrackColumns):
+        return tracks.frame_idx, tracks.track_ids, tracks.bboxes
+    frame_idx, track_ids, bboxes = [], [], []
+    for frame_id, frame in enumerate(tracks):
+        for track_id, info in frame.items():
+            frame_idx.append(frame_id)
+            track_ids.append(int(track_id))
+            bboxes.append(info.get("bbox", []))
+
+    frame_idx = np.asarray(frame_idx, dtype=np.int32)
+    track_ids = np.asarray(track_ids, dtype=np.int32)
+    bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+    return frame_idx, track_ids, bboxes
+
+def frame_arrays_to_columns(frame_arrays):
+    # [(track_ids, bboxes), ...] per frame -> columnar (frame_idx, track_id, bbox, num_frames)
+    counts = [len(track_ids) for track_ids, _ in frame_arrays]
+    frame_idx = np.repeat(np.arange(len(frame_arrays), dtype=np.int32), counts)
+    track_ids = np.concatenate([ids for ids, _ in frame_arrays] + [np.empty(0, dtype=np.int32)]).astype(np.int32)
+    bboxes = np.concatenate([b for _, b in frame_arrays] + [np.empty((0, 4), dtype=np.float32)]).astype(np.float32)
+    return frame_idx, track_ids, bboxes, len(frame_arrays)
+
+def frame_arrays_to_tracks(frame_arrays):
+    # [(track_ids, bboxes), ...] per frame -> per-frame {track_id: {"bbox": [...]}} dicts
+    return [
+        {track_id: {"bbox": bbox} for track_id, bbox in zip(track_ids.tolist(), bboxes.tolist())}
+        for track_ids, bboxes in frame_arrays
+    ]
+
+class FrameTracks(Mapping):
+    """
+    Read-only {track_id: {"bbox": [...]}} view of one frame's rows of the track columns. The bbox dicts are
+    only built for the detections that are looked up, track_ids / bboxes give the frame's arrays as they are.
+    """
+    __slots__ = ("track_ids", "bboxes")
+
+    def __init__(self, track_ids, bboxes):
+        self.track_ids = track_ids
+        self.bboxes = bboxes
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def __iter__(self):
+        return iter(self.track_ids.tolist())
+
+    def __contains__(self, track_id):
+        return bool((self.track_ids == track_id).any())
+
+    def __getitem__(self, track_id):
+        rows = np.flatnonzero(self.track_ids == track_id)
+        if len(rows) == 0:
+            raise KeyError(track_id)
+        return {"bbox": self.bboxes[rows[0]].tolist()}
+
+    def items(self):
+        return zip(self.track_ids.tolist(), ({"bbox": bbox} for bbox in self.bboxes.tolist()))
+
+    def values(self):
+        return ({"bbox": bbox} for bbox in self.bboxes.tolist())
+
+class TrackColumns(Sequence):
+    """
+    Per-frame tracks backed by the (frame_idx, track_id, bbox) columns, tracks[frame_id] is a FrameTracks view
+    of that frame's rows, found once with np.searchsorted on frame_idx. Drop-in for the list of dicts.
+    """
+    def __init__(self, frame_idx, track_ids, bboxes, num_frames):
+        if len(frame_idx) > 1 and (np.diff(frame_idx) < 0).any():
+            order = np.argsort(frame_idx, kind="stable")
+            frame_idx, track_ids, bboxes = frame_idx[order], track_ids[order], bboxes[order]
+        self.frame_idx = frame_idx
+        self.track_ids = track_ids
+        self.bboxes = bboxes
+        self.num_frames = num_frames
+        self.bounds = np.searchsorted(frame_idx, np.arange(num_frames + 1)).tolist()
+
+    def __len__(self):
+        return self.num_frames
+
+    def __getitem__(self, frame_id):
+        if isinstance(frame_id, slice):
+            return [self[i] for i in range(*frame_id.indices(self.num_frames))]
+        if frame_id < 0:
+            frame_id += self.num_frames
+        if not 0 <= frame_id < self.num_frames:
+            raise IndexError(frame_id)
+        start, end = self.bounds[frame_id], self.bounds[frame_id + 1]
+        return FrameTracks(self.track_ids[start:end], self.bboxes[start:end])
+
+def frame_track_arrays(frame):
+    # (track_ids, (K, 4) bboxes) of one frame, the columns themselves for a FrameTracks
+    if isinstance(frame, FrameTracks):
+        return frame.track_ids, frame.bboxes
+    track_ids = np.fromiter(frame.keys(), dtype=np.int64, count=len(frame))
+    bboxes = np.array([info["bbox"] for info in frame.values()], dtype=np.float32).reshape(-1, 4)
+    return track_ids, bboxes
+
+def json_to_tracks(data):
+    # JSON turns the int track ids (and frame ids, for a {frame_id: frame} dict) into strings, restore them
+    if isinstance(data, dict):
+        frames = {int(frame_id): frame for frame_id, frame in data.items()}
+        data = [frames.get(frame_id, {}) for frame_id in range(max(frames, default=-1) + 1)]
+    return [{int(track_id): info for track_id, info in frame.items()} for frame in data]
+
+def arrays_to_tracks(frame_idx, track_ids, bboxes, num_frames):
+    # columns -> per-frame tracks without a python object per detection
+    return TrackColumns(frame_idx, track_ids, bboxes, num_frames)
+
+def encode_tracks(**named_tracks):
+    return encode_track_columns(**{
+        name: (*tracks_to_arrays(tracks), len(tracks)) for name, tracks in named_tracks.items()
+    })
+
+def encode_track_columns(**named_columns):
+    # same wire format as encode_tracks, from (frame_idx, track_id, bbox, num_frames) columns
+    arrays = {}
+    for name, (frame_idx, track_ids, bboxes, num_frames) in named_columns.items():
+        arrays[f"{name}.frame_idx"] = np.asarray(frame_idx, dtype=np.int32)
+        arrays[f"{name}.track_id"] = np.asarray(track_ids, dtype=np.int32)
+        arrays[f"{name}.bbox"] = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        arrays[f"{name}.num_frames"] = np.int32(num_frames)
+
+    # uncompressed, so loading is a plain buffer copy per column
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+def decode_tracks(data):
+    """Returns {name: (frame_idx, track_id, bbox, num_frames)} from encode_tracks output."""
+    out = {}
+    with np.load(io.BytesIO(data)) as npz:
+        names = {key.rsplit(".", 1)[0] for key in npz.files}
+        for name in names:
+            out[name] = (
+                npz[f"{name}.frame_idx"],
+                npz[f"{name}.track_id"],
+                npz[f"{name}.bbox"],
+                int(npz[f"{name}.num_frames"]),
+            )
+    return out
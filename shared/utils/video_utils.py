@@ -1,5 +1,8 @@
 import os
 import cv2
+import shutil
+import subprocess
+import numpy as np
 
 def read_video(video_path):
     capture = cv2.VideoCapture(video_path)
@@ -11,19 +14,100 @@ def read_video(video_path):
         frames.append(frame)
     return frames
 
-def save_video(output_frames, output_path):
+def read_frames_at(video_path, frame_ids, max_grab_gap=30):
+    """
+    Decodes only the given frames, returns {frame_id: frame}.
+    Short gaps are skipped with grab() (no color conversion), longer ones with a seek, or with grab()
+    when the seek fails. Frames that cannot be read are left out, callers check which ids came back.
+    """
+    capture = cv2.VideoCapture(video_path)
+    frames = {}
+    position = 0 # None once a failed read left the position unknown
+    try:
+        for frame_id in sorted(set(frame_ids)):
+            seek = position is None or frame_id < position or frame_id - position > max_grab_gap
+            if seek and not capture.set(cv2.CAP_PROP_POS_FRAMES, frame_id):
+                if position is None or frame_id < position:
+                    continue
+                seek = False
+            if not seek:
+                for _ in range(frame_id - position):
+                    capture.grab()
+            returned, frame = capture.read()
+            if not returned:
+                position = None
+                continue
+            frames[frame_id] = frame
+            position = frame_id + 1
+    finally:
+        capture.release()
+
+    missing = len(set(frame_ids)) - len(frames)
+    if missing:
+        print(f"[Video] {missing} of {len(set(frame_ids))} requested frames could not be read from {video_path}")
+    return frames
+
+class FFmpegVideoWriter:
+    # pipes raw BGR frames into a single libx264 encode, the mp4 is browser ready (faststart) once released
+    def __init__(self, output_path, frame_width, frame_height, fps=24.0, preset="fast"):
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{frame_width}x{frame_height}", "-r", str(fps),
+            "-i", "-",
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", # yuv420p needs even dimensions
+            "-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+            output_path,
+        ]
+        self.output_path = output_path
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        self.process.stdin.write(np.ascontiguousarray(frame).data)
+
+    def release(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {self.output_path}")
+
+    def abort(self):
+        # stops an unfinished encode, the half-written output is removed by abort_video_writer
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        try:
+            self.process.stdin.close()
+        except OSError: # the pipe is already broken
+            pass
+
+def open_video_writer(output_path, frame_width, frame_height, fps=24.0):
     # ensure local dir exists
     dir_name = os.path.dirname(output_path)
     if dir_name and not os.path.exists(dir_name):
         os.makedirs(dir_name, exist_ok=True)
 
+    if shutil.which("ffmpeg"):
+        return FFmpegVideoWriter(output_path, frame_width, frame_height, fps)
+
+    # without ffmpeg fall back to OpenCV, the mp4v output does not play in browsers
     fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    return cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+
+def abort_video_writer(writer, output_path):
+    # on errors while rendering, no encoder process or partial file is left behind
+    if isinstance(writer, FFmpegVideoWriter):
+        writer.abort()
+    else:
+        writer.release()
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+def save_video(output_frames, output_path, fps=24.0):
     frame_height, frame_width = output_frames[0].shape[0], output_frames[0].shape[1]
-    out = cv2.VideoWriter(output_path, fourcc, 24.0, (frame_width, frame_height))
+    out = open_video_writer(output_path, frame_width, frame_height, fps)
 
     for frame in output_frames:
         out.write(frame)
 
     out.release()
-
-
@@ -0,0 +1,40 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "services"))
+
+from shared.utils import json_to_tracks
+from team_assigner_service.processing.team_assigner import TeamAssigner
+
+def make_tracks(num_frames=12):
+    # two players per team, the same boxes in every frame
+    boxes = {1: [10, 10, 50, 110], 2: [70, 10, 110, 110], 3: [130, 10, 170, 110], 4: [190, 10, 230, 110]}
+    return [{pid: {"bbox": box} for pid, box in boxes.items()} for _ in range(num_frames)]
+
+def make_frames(num_frames=12):
+    frames = np.zeros((num_frames, 128, 256, 3), dtype=np.uint8)
+    frames[:, :, :120] = (0, 0, 255)
+    frames[:, :, 120:] = (255, 0, 0)
+    return frames
+
+def test_json_tracks_get_int_keys():
+    tracks = make_tracks()
+    from_json = json_to_tracks(json.loads(json.dumps(tracks)))
+    assert from_json == tracks
+
+    by_frame = json_to_tracks(json.loads(json.dumps({"1": tracks[0]})))
+    assert by_frame == [{}, tracks[0]]
+
+def test_assign_teams_with_json_tracks():
+    # the /assign_teams JSON upload, json.load gives string track ids
+    player_tracks = json_to_tracks(json.loads(json.dumps(make_tracks())))
+    assigner = TeamAssigner()
+    frame_assignments, _, _ = assigner.assign_teams(make_frames(), player_tracks)
+
+    assert set(frame_assignments[0]) == {1, 2, 3, 4}
+    assert frame_assignments[0][1] == frame_assignments[0][2]
+    assert frame_assignments[0][3] == frame_assignments[0][4]
+    assert frame_assignments[0][1] != frame_assignments[0][3]